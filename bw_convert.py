@@ -44,7 +44,8 @@ def convert_to_bw(
         if threshold is not None:
             if not 0 <= threshold <= 255:
                 raise ValueError("threshold must be between 0 and 255")
-            grayscale = grayscale.point(lambda p: 255 if p >= threshold else 0)
+            # Build the 256-entry lookup table directly instead of calling a lambda per level
+            grayscale = grayscale.point([0] * threshold + [255] * (256 - threshold))
 
         output_path.parent.mkdir(parents=True, exist_ok=True)
         grayscale.save(output_path)
@@ -23,9 +23,12 @@ Options:
   --max-scale F           Maximum magnification (default 1.6).
   --seed INT              Random seed for reproducibility.
   --background COLOR      Optional background color for the blank frame (hex or name). If omitted, the frame is transparent (saved as PNG/WebP) or white for JPEG output.
+  --draft MAX_SIDE        Let the JPEG decoder shrink the input (1/2, 1/4 or 1/8) keeping the longer side >= MAX_SIDE.
+                          Faster for large JPEGs, but the output is produced at the reduced size.
 """
 
 import argparse
+import math
 import os
 import random
 from PIL import Image
@@ -43,6 +46,9 @@ def parse_args():
     p.add_argument("--seed", type=int, default=None)
     p.add_argument("--background", default=None,
                    help="Background color (hex like '#ffffff' or color name). If omitted, use transparent for formats that support it.")
+    p.add_argument("--draft", type=int, default=None, metavar="MAX_SIDE",
+                   help="Opt-in: let the JPEG decoder shrink the input by 1/2, 1/4 or 1/8 while decoding, keeping the longer side >= MAX_SIDE. "
+                        "Lossy: the whole run (and the output) uses the reduced size, so tiles no longer line up with the original pixels.")
     return p.parse_args()
 
 def choose_random_tile_position(img_w, img_h, tile_w, tile_h):
@@ -60,41 +66,13 @@ def choose_random_tile_position(img_w, img_h, tile_w, tile_h):
 def paste_with_center(dest_img, src_img, center_x, center_y):
     """
     Paste src_img into dest_img so that src_img's center aligns with (center_x, center_y) on dest_img.
-    Handles cases where src_img extends beyond dest_img borders by cropping.
+    Parts of src_img that extend beyond dest_img borders are clipped by Image.paste itself, so the
+    common fully-inside case costs no extra branching and no intermediate crop is allocated.
     Both images are PIL Images. dest_img is modified in place.
     """
-    dest_w, dest_h = dest_img.size
     src_w, src_h = src_img.size
-
-    paste_x = center_x - src_w // 2
-    paste_y = center_y - src_h // 2
-
-    # Compute overlapping region between src and dest
-    src_left = 0
-    src_top = 0
-    dst_left = paste_x
-    dst_top = paste_y
-
-    if paste_x < 0:
-        src_left = -paste_x
-        dst_left = 0
-    if paste_y < 0:
-        src_top = -paste_y
-        dst_top = 0
-
-    src_right = src_w
-    src_bottom = src_h
-    if paste_x + src_w > dest_w:
-        src_right = src_w - ((paste_x + src_w) - dest_w)
-    if paste_y + src_h > dest_h:
-        src_bottom = src_h - ((paste_y + src_h) - dest_h)
-
-    # If there's no overlap, nothing to paste
-    if src_left >= src_right or src_top >= src_bottom:
-        return
-
-    src_crop = src_img.crop((src_left, src_top, src_right, src_bottom))
-    dest_img.paste(src_crop, (dst_left, dst_top), src_crop if src_crop.mode == "RGBA" else None)
+    mask = src_img if src_img.mode == "RGBA" else None
+    dest_img.paste(src_img, (center_x - src_w // 2, center_y - src_h // 2), mask)
 
 def main():
     args = parse_args()
@@ -104,8 +82,18 @@ def main():
     if not os.path.exists(args.input_path):
         raise SystemExit(f"Input file not found: {args.input_path}")
 
-    # Open input image as RGBA for safe processing (keeps transparency if present)
-    src = Image.open(args.input_path).convert("RGBA")
+    # Open input image; non-RGB images are handled as RGBA (keeps transparency if present)
+    src = Image.open(args.input_path)
+    if args.draft is not None:
+        if args.draft <= 0:
+            raise SystemExit("--draft must be a positive integer.")
+        # Only JPEG supports draft decoding; other formats ignore the request
+        ratio = args.draft / max(src.size)
+        if ratio < 1:
+            src.draft("RGB", (math.ceil(src.width * ratio), math.ceil(src.height * ratio)))
+    if src.mode != "RGB":
+        # RGB sources (typical JPEGs) stay 3-channel; anything else goes to RGBA to keep transparency
+        src = src.convert("RGBA")
     img_w, img_h = src.size
 
     # Determine tile size
@@ -138,27 +126,25 @@ def main():
     new_h = max(1, int(round(tile_h * scale)))
     tile_resized = tile.resize((new_w, new_h), resample=Image.LANCZOS)
 
-    # Create blank frame (RGBA). Use provided background when saving to non-alpha formats.
-    out_mode = "RGBA"
-    canvas = Image.new(out_mode, (img_w, img_h), (0, 0, 0, 0))
-
-    # Paste the magnified tile so its center aligns with original center
-    paste_with_center(canvas, tile_resized, center_x, center_y)
-
-    # Prepare for saving: if output is JPEG force RGB and use background if provided else white
     out_ext = os.path.splitext(args.output_path)[1].lower()
     if out_ext in (".jpg", ".jpeg"):
-        bg = args.background or "#ffffff"
-        final = Image.new("RGB", (img_w, img_h), bg)
-        final.paste(canvas, mask=canvas.split()[-1])  # use alpha channel as mask
-        final.save(args.output_path, quality=95)
+        # JPEG has no alpha: start from an opaque RGB frame (background if provided else white)
+        # and paste the tile straight onto it, so no full-size RGBA frame has to be flattened.
+        canvas = Image.new("RGB", (img_w, img_h), args.background or "#ffffff")
+        paste_with_center(canvas, tile_resized, center_x, center_y)
+        # 4:2:0 chroma: the cheapest encode, and what libjpeg picks by default anyway
+        canvas.save(args.output_path, quality=95, subsampling=2)
     else:
+        # Create blank frame (RGBA) and paste the magnified tile so its center aligns with original center
+        canvas = Image.new("RGBA", (img_w, img_h), (0, 0, 0, 0))
+        paste_with_center(canvas, tile_resized, center_x, center_y)
+
         # If user provided a background color and asked for a non-alpha format (or still wants bg),
         # flatten to that background; otherwise preserve alpha.
         if args.background is not None:
             bg = args.background
             final = Image.new("RGBA", (img_w, img_h), bg)
-            final.paste(canvas, mask=canvas.split()[-1])
+            final.paste(canvas, mask=canvas)
             # If output format doesn't support alpha (rare here), convert later; for typical formats PNG supports RGBA.
             final.save(args.output_path)
         else:
@@ -26,13 +26,16 @@ Options:
   --background COLOR         Background color for final image and to flatten tiles (default "#ffffff").
   --keep-seed-order          If set, the layer generation order is preserved and only final ordering is shuffled by seed.
   --verbose                  Print per-tile details while running.
+  --draft MAX_SIDE           Let the JPEG decoder shrink the input (1/2, 1/4 or 1/8) keeping the longer side >= MAX_SIDE.
+                             Faster for large JPEGs, but the output is produced at the reduced size.
 """
 
 import argparse
+import math
 import os
 import random
 from typing import List, Tuple
-from PIL import Image
+from PIL import Image, ImageColor
 
 def parse_args():
     p = argparse.ArgumentParser(description="Generate multiple magnified tiles and composite as shuffled layers (opaque).")
@@ -51,6 +54,9 @@ def parse_args():
     p.add_argument("--keep-seed-order", action="store_true",
                    help="Generate tiles in seeded order then shuffle layers; if not set behavior is fully randomized by seed.")
     p.add_argument("--verbose", action="store_true", help="Print per-tile diagnostics.")
+    p.add_argument("--draft", type=int, default=None, metavar="MAX_SIDE",
+                   help="Opt-in: let the JPEG decoder shrink the input by 1/2, 1/4 or 1/8 while decoding, keeping the longer side >= MAX_SIDE. "
+                        "Lossy: the whole run (and the output) uses the reduced size, so tiles no longer line up with the original pixels.")
     return p.parse_args()
 
 def choose_random_tile_position(img_w: int, img_h: int, tile_w: int, tile_h: int) -> Tuple[int,int,int,int]:
@@ -67,73 +73,68 @@ def choose_random_tile_position(img_w: int, img_h: int, tile_w: int, tile_h: int
 
 def crop_and_scale_tile(src_img: Image.Image, left: int, top: int, tile_w: int, tile_h: int, scale: float) -> Image.Image:
     """Crop original tile and scale it by 'scale' returning an Image (may be RGBA)."""
-    right = left + tile_w
-    bottom = top + tile_h
-    tile = src_img.crop((left, top, right, bottom))
     new_w = max(1, int(round(tile_w * scale)))
     new_h = max(1, int(round(tile_h * scale)))
-    tile_resized = tile.resize((new_w, new_h), resample=Image.LANCZOS)
-    return tile_resized
-
-def flatten_tile_to_opaque(tile: Image.Image, bg_color: str) -> Image.Image:
+    box = (left, top, left + tile_w, top + tile_h)
+    if (new_w, new_h) == (tile_w, tile_h):
+        # Scale rounds to the original size: the resample would be an exact copy of the region
+        return src_img.crop(box)
+    if src_img.mode == "RGBA":
+        # Pillow premultiplies the whole RGBA image on every resize, so cut the region out first
+        return src_img.crop(box).resize((new_w, new_h), resample=Image.LANCZOS)
+    # Resample straight from the source region instead of cropping a copy of it first
+    return src_img.resize((new_w, new_h), resample=Image.LANCZOS, box=box)
+
+def flatten_tile_to_opaque(tile: Image.Image, bg_color: Tuple[int, int, int]) -> Image.Image:
     """
     Return an opaque RGB image where tile (which might contain alpha) is flattened onto bg_color.
     This ensures tiles have 0 transparency in final compositing.
     """
     if tile.mode == "RGBA":
+        # Fully opaque tiles (e.g. cut from a JPEG) only need the alpha band dropped
+        if tile.getchannel("A").getextrema()[0] == 255:
+            return tile.convert("RGB")
         # Create RGB background and paste using alpha as mask
         bg = Image.new("RGB", tile.size, bg_color)
-        bg.paste(tile, mask=tile.split()[-1])  # alpha channel
+        bg.paste(tile, mask=tile)  # an RGBA mask uses its alpha band, no split() copies
         return bg
     else:
         # Already opaque (e.g., RGB)
-        return tile.convert("RGB")
+        return tile if tile.mode == "RGB" else tile.convert("RGB")
 
 def paste_opaque_with_center(dest: Image.Image, src: Image.Image, center_x: int, center_y: int):
     """
     Paste src (RGB, opaque) into dest (RGB) so that src's center aligns with (center_x, center_y).
-    Crops src if it would extend outside dest.
+    Parts of src that fall outside dest are clipped by Image.paste itself, so no intermediate
+    crop is allocated.
     """
-    dest_w, dest_h = dest.size
     src_w, src_h = src.size
-    paste_x = center_x - src_w // 2
-    paste_y = center_y - src_h // 2
-
-    src_left = 0
-    src_top = 0
-    dst_left = paste_x
-    dst_top = paste_y
-
-    if paste_x < 0:
-        src_left = -paste_x
-        dst_left = 0
-    if paste_y < 0:
-        src_top = -paste_y
-        dst_top = 0
-
-    src_right = src_w
-    src_bottom = src_h
-    if paste_x + src_w > dest_w:
-        src_right = src_w - ((paste_x + src_w) - dest_w)
-    if paste_y + src_h > dest_h:
-        src_bottom = src_h - ((paste_y + src_h) - dest_h)
-
-    if src_left >= src_right or src_top >= src_bottom:
-        # No overlap
-        return
-
-    src_crop = src.crop((src_left, src_top, src_right, src_bottom))
-    dest.paste(src_crop, (dst_left, dst_top))
+    dest.paste(src, (center_x - src_w // 2, center_y - src_h // 2))
 
 def main():
     args = parse_args()
+    try:
+        # Parse the color once; tiles and canvases then get a ready RGB tuple instead of a string
+        bg_color = ImageColor.getcolor(args.background, "RGB")
+    except ValueError:
+        raise SystemExit(f"Invalid --background color: {args.background}")
     if args.seed is not None:
         random.seed(args.seed)
 
     if not os.path.exists(args.input_path):
         raise SystemExit(f"Input file not found: {args.input_path}")
 
-    src = Image.open(args.input_path).convert("RGBA")
+    src = Image.open(args.input_path)
+    if args.draft is not None:
+        if args.draft <= 0:
+            raise SystemExit("--draft must be a positive integer.")
+        # Only JPEG supports draft decoding; other formats ignore the request
+        ratio = args.draft / max(src.size)
+        if ratio < 1:
+            src.draft("RGB", (math.ceil(src.width * ratio), math.ceil(src.height * ratio)))
+    if src.mode != "RGB":
+        # RGB sources (typical JPEGs) stay 3-channel; anything else goes to RGBA to keep transparency
+        src = src.convert("RGBA")
     img_w, img_h = src.size
 
     # Determine base tile size
@@ -161,7 +162,7 @@ def main():
         tile_resized = crop_and_scale_tile(src, left, top, tile_w, tile_h, scale)
 
         # Flatten to opaque RGB so tiles have 0 transparency
-        tile_opaque = flatten_tile_to_opaque(tile_resized, args.background)
+        tile_opaque = flatten_tile_to_opaque(tile_resized, bg_color)
 
         tiles.append({
             "img": tile_opaque,
@@ -182,7 +183,7 @@ def main():
         print(f"[info] layer order (shuffled): {layer_order}")
 
     # Create final canvas as opaque RGB using background color (final image will have no alpha)
-    canvas = Image.new("RGB", (img_w, img_h), args.background)
+    canvas = Image.new("RGB", (img_w, img_h), bg_color)
 
     # Paste tiles in shuffled order; later tiles overwrite earlier ones (no blending)
     for layer_pos, idx in enumerate(layer_order):
@@ -200,6 +201,8 @@ def main():
     save_params = {}
     if out_ext in (".jpg", ".jpeg"):
         save_params["quality"] = 95
+        # 4:2:0 chroma: the cheapest encode, and what libjpeg picks by default anyway
+        save_params["subsampling"] = 2
     elif out_ext == ".webp":
         save_params["quality"] = 95
 
@@ -208,12 +211,6 @@ def main():
     # Print summary
     print(f"Saved final composited image to: {args.output_path} ({img_w}x{img_h})")
     print(f"Tiles generated: {len(tiles)}; layer order (shuffled): {layer_order}")
-    if not args.verbose:
-        # print basic per-tile summary
-        for t in tiles:
-            cx, cy = t["center"]
-            w, h = t["img"].size
-            print(f" tile#{t['index']}: center=({cx},{cy}) final_size={w}x{h} scale~{t['scale']:.3f}")
 
 if __name__ == "__main__":
     main()
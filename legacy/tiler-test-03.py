@@ -17,16 +17,25 @@ Usage examples:
   python tile_zoom_gif.py input.jpg out.gif --frames 12 --tiles 6 --tile-size-percent 0.18 --min-scale 1.2 --max-scale 1.6 --duration 80 --seed 42
   python tile_zoom_gif.py input.jpg animation.gif --frames 20 --tiles 8 --background "#000000" --save-frames-dir frames/
 
+Frames are independent of each other (each one gets its own seed drawn up front from --seed),
+so they are rendered in parallel worker processes; use --workers 1 to render in-process.
+
+For large JPEG inputs, --draft MAX_SIDE lets the decoder shrink the image by 1/2, 1/4 or 1/8
+while decoding. This is lossy: the GIF is produced at the reduced size.
+
 Dependencies:
   pip install pillow
 
 Author: Copied/derived from earlier tile_zoom_layers logic
 """
 import argparse
+import math
+import multiprocessing
 import os
 import random
-from typing import Tuple, List
-from PIL import Image
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Dict, Optional, Tuple, List
+from PIL import Image, ImageColor, features
 
 def parse_args():
     p = argparse.ArgumentParser(description="Produce several composited outputs from one photo and assemble them into a GIF.")
@@ -50,6 +59,11 @@ def parse_args():
     p.add_argument("--save-frames-dir", default=None,
                    help="Optional directory to save each intermediate frame as PNG for inspection.")
     p.add_argument("--verbose", action="store_true", help="Print per-frame and per-tile diagnostics.")
+    p.add_argument("--workers", type=int, default=None,
+                   help="Number of worker processes used to render frames (default: CPU count; 1 renders in-process).")
+    p.add_argument("--draft", type=int, default=None, metavar="MAX_SIDE",
+                   help="Opt-in: let the JPEG decoder shrink the input by 1/2, 1/4 or 1/8 while decoding, keeping the longer side >= MAX_SIDE. "
+                        "Lossy: the whole run (and the output) uses the reduced size, so tiles no longer line up with the original pixels.")
     return p.parse_args()
 
 def choose_random_tile_position(rng: random.Random, img_w: int, img_h: int, tile_w: int, tile_h: int) -> Tuple[int,int,int,int]:
@@ -66,63 +80,55 @@ def choose_random_tile_position(rng: random.Random, img_w: int, img_h: int, tile
 
 def crop_and_scale_tile(src_img: Image.Image, left: int, top: int, tile_w: int, tile_h: int, scale: float) -> Image.Image:
     """Crop original tile and scale it by 'scale' returning an Image (RGBA or RGB depending on source)."""
-    right = left + tile_w
-    bottom = top + tile_h
-    tile = src_img.crop((left, top, right, bottom))
     new_w = max(1, int(round(tile_w * scale)))
     new_h = max(1, int(round(tile_h * scale)))
-    tile_resized = tile.resize((new_w, new_h), resample=Image.LANCZOS)
-    return tile_resized
-
-def flatten_tile_to_opaque(tile: Image.Image, bg_color: str) -> Image.Image:
+    box = (left, top, left + tile_w, top + tile_h)
+    if (new_w, new_h) == (tile_w, tile_h):
+        # Scale rounds to the original size: the resample would be an exact copy of the region
+        return src_img.crop(box)
+    if src_img.mode == "RGBA":
+        # Pillow premultiplies the whole RGBA image on every resize, so cut the region out first
+        return src_img.crop(box).resize((new_w, new_h), resample=Image.LANCZOS)
+    # Resample straight from the source region instead of cropping a copy of it first
+    return src_img.resize((new_w, new_h), resample=Image.LANCZOS, box=box)
+
+def flatten_tile_to_opaque(tile: Image.Image, bg_color: Tuple[int, int, int]) -> Image.Image:
     """
     Return an opaque RGB image where tile (which might contain alpha) is flattened onto bg_color.
     Ensures tiles have no transparency.
     """
     if tile.mode == "RGBA":
+        # Fully opaque tiles (e.g. cut from a JPEG) only need the alpha band dropped
+        if tile.getchannel("A").getextrema()[0] == 255:
+            return tile.convert("RGB")
         bg = Image.new("RGB", tile.size, bg_color)
-        bg.paste(tile, mask=tile.split()[-1])  # use alpha as mask
+        bg.paste(tile, mask=tile)  # an RGBA mask uses its alpha band, no split() copies
         return bg
     else:
-        return tile.convert("RGB")
+        return tile if tile.mode == "RGB" else tile.convert("RGB")
 
 def paste_opaque_with_center(dest: Image.Image, src: Image.Image, center_x: int, center_y: int):
     """
     Paste src (RGB, opaque) into dest (RGB) so that src's center aligns with (center_x, center_y).
-    Crops src if it would extend outside dest.
+    Parts of src that fall outside dest are clipped by Image.paste itself, so no intermediate
+    crop is allocated.
     """
-    dest_w, dest_h = dest.size
     src_w, src_h = src.size
-    paste_x = center_x - src_w // 2
-    paste_y = center_y - src_h // 2
-
-    src_left = 0
-    src_top = 0
-    dst_left = paste_x
-    dst_top = paste_y
-
-    if paste_x < 0:
-        src_left = -paste_x
-        dst_left = 0
-    if paste_y < 0:
-        src_top = -paste_y
-        dst_top = 0
-
-    src_right = src_w
-    src_bottom = src_h
-    if paste_x + src_w > dest_w:
-        src_right = src_w - ((paste_x + src_w) - dest_w)
-    if paste_y + src_h > dest_h:
-        src_bottom = src_h - ((paste_y + src_h) - dest_h)
-
-    if src_left >= src_right or src_top >= src_bottom:
-        # No overlap
-        return
-
-    src_crop = src.crop((src_left, src_top, src_right, src_bottom))
-    dest.paste(src_crop, (dst_left, dst_top))
+    dest.paste(src, (center_x - src_w // 2, center_y - src_h // 2))
+
+# Pillow releases the GIL while resampling, so the tiles of one frame are resized on a few threads.
+# The pool is created lazily so every worker process gets its own, sized by the "tile_threads"
+# setting so that workers x threads stays within the CPU count.
+_tile_pool: Optional[ThreadPoolExecutor] = None
+
+def _get_tile_pool() -> ThreadPoolExecutor:
+    global _tile_pool
+    if _tile_pool is None:
+        _tile_pool = ThreadPoolExecutor(max_workers=_WORKER["tile_threads"])
+    return _tile_pool
 
 def generate_single_frame(src_rgba: Image.Image,
+                          canvas: Image.Image,
                           img_w: int,
                           img_h: int,
                           tiles_count: int,
@@ -130,20 +136,30 @@ def generate_single_frame(src_rgba: Image.Image,
                           tile_h: int,
                           min_scale: float,
                           max_scale: float,
-                          bg_color: str,
+                          bg_color: Tuple[int, int, int],
                           rng: random.Random,
-                          verbose: bool = False):
+                          log: Optional[List[str]] = None):
     """
     Generate one composited RGB frame. Uses rng for all randomness to make generation deterministic
     for a given rng state.
-    Returns an RGB Image.
+    The frame is drawn into canvas (an RGB image of size img_w x img_h), which is refilled with
+    bg_color first so a single buffer can be reused across frames. Returns canvas.
+    If log is a list, per-tile details are appended to it instead of being printed immediately.
     """
-    # Generate tile entries
-    tiles = []
-    for i in range(tiles_count):
+    # Draw every tile's placement up front so the rng sequence does not depend on thread scheduling
+    placements = []
+    for _ in range(tiles_count):
         left, top, center_x, center_y = choose_random_tile_position(rng, img_w, img_h, tile_w, tile_h)
         scale = rng.uniform(min_scale, max_scale)
-        tile_resized = crop_and_scale_tile(src_rgba, left, top, tile_w, tile_h, scale)
+        placements.append((left, top, center_x, center_y, scale))
+
+    # Resize all tiles concurrently; results come back in placement order
+    resized_tiles = _get_tile_pool().map(
+        lambda p: crop_and_scale_tile(src_rgba, p[0], p[1], tile_w, tile_h, p[4]), placements)
+
+    # Generate tile entries
+    tiles = []
+    for i, ((left, top, center_x, center_y, scale), tile_resized) in enumerate(zip(placements, resized_tiles)):
         tile_opaque = flatten_tile_to_opaque(tile_resized, bg_color)
         tiles.append({
             "img": tile_opaque,
@@ -152,32 +168,107 @@ def generate_single_frame(src_rgba: Image.Image,
             "orig_box": (left, top, left + tile_w, top + tile_h),
             "index": i,
         })
-        if verbose:
-            print(f"  [tile gen] idx={i} orig_box={(left,top,tile_w,tile_h)} center=({center_x},{center_y}) scale={scale:.3f} resized={tile_resized.size}")
+        if log is not None:
+            log.append(f"  [tile gen] idx={i} orig_box={(left,top,tile_w,tile_h)} center=({center_x},{center_y}) scale={scale:.3f} resized={tile_resized.size}")
 
     # Shuffle layer order using rng
     order = list(range(len(tiles)))
     rng.shuffle(order)
-    if verbose:
-        print(f"  [layer order] {order}")
+    if log is not None:
+        log.append(f"  [layer order] {order}")
 
-    # Create opaque RGB canvas and paste
-    canvas = Image.new("RGB", (img_w, img_h), bg_color)
+    # Reset the reused canvas to the background and paste
+    canvas.paste(bg_color, (0, 0, img_w, img_h))
     for layer_pos, idx in enumerate(order):
         entry = tiles[idx]
         paste_opaque_with_center(canvas, entry["img"], entry["center"][0], entry["center"][1])
-        if verbose:
-            print(f"   [paste] layer={layer_pos} -> tile#{entry['index']} center={entry['center']} size={entry['img'].size}")
+        if log is not None:
+            log.append(f"   [paste] layer={layer_pos} -> tile#{entry['index']} center={entry['center']} size={entry['img'].size}")
 
     return canvas
 
+# Per-process render settings, filled in by _init_worker (once per worker process)
+_WORKER: Dict = {}
+
+def _init_worker(src: Image.Image, settings: Dict):
+    """Store the source image and frame settings, and allocate this process's reusable canvas."""
+    _WORKER.update(settings)
+    _WORKER["src"] = src
+    _WORKER["canvas"] = Image.new("RGB", src.size, settings["bg_color"])
+
+def build_shared_palette(keyframe: Image.Image, colors: int = 256) -> Image.Image:
+    """
+    Quantize one representative frame and return a tiny 'P' image carrying its palette, to be
+    passed as Image.quantize(palette=...) for every frame. A single palette quantizes each frame
+    with a cheap nearest-color lookup and lets the GIF use one global color table.
+    """
+    method = Image.Quantize.LIBIMAGEQUANT if features.check_feature("libimagequant") else Image.Quantize.MEDIANCUT
+    quantized = keyframe.quantize(colors=colors, method=method)
+    palette_img = Image.new("P", (1, 1))
+    palette_img.putpalette(quantized.getpalette())
+    return palette_img
+
+def _draw_frame(fi: int, frame_seed: int) -> Image.Image:
+    """Render frame fi from its seed into this process's canvas and return the RGB canvas."""
+    w = _WORKER
+    # Verbose lines are collected and written once per frame, so parallel workers don't interleave
+    log = [f"[frame {fi}] seed={frame_seed}"] if w["verbose"] else None
+    img_w, img_h = w["src"].size
+    frame_img = generate_single_frame(
+        src_rgba=w["src"],
+        canvas=w["canvas"],
+        img_w=img_w,
+        img_h=img_h,
+        tiles_count=w["tiles_count"],
+        tile_w=w["tile_w"],
+        tile_h=w["tile_h"],
+        min_scale=w["min_scale"],
+        max_scale=w["max_scale"],
+        bg_color=w["bg_color"],
+        rng=random.Random(frame_seed),
+        log=log
+    )
+
+    # Optionally save each frame PNG for inspection
+    if w["save_frames_dir"]:
+        frame_path = os.path.join(w["save_frames_dir"], f"frame_{fi:03d}.png")
+        frame_img.save(frame_path)
+        if log is not None:
+            log.append(f"  Saved intermediate frame: {frame_path}")
+
+    if log is not None:
+        print("\n".join(log), flush=True)
+    return frame_img
+
+def _render_frame(fi: int, frame_seed: int) -> Image.Image:
+    """Render frame fi and quantize it to the shared palette (before the canvas is redrawn)."""
+    frame_img = _draw_frame(fi, frame_seed)
+    return frame_img.quantize(palette=_WORKER["palette"], dither=Image.Dither.FLOYDSTEINBERG)
+
 def main():
     args = parse_args()
+    try:
+        # Parse the color once; tiles and canvases then get a ready RGB tuple instead of a string
+        bg_color = ImageColor.getcolor(args.background, "RGB")
+    except ValueError:
+        raise SystemExit(f"Invalid --background color: {args.background}")
 
     if not os.path.exists(args.input_path):
         raise SystemExit(f"Input file not found: {args.input_path}")
 
-    src = Image.open(args.input_path).convert("RGBA")
+    src = Image.open(args.input_path)
+    if args.draft is not None:
+        if args.draft <= 0:
+            raise SystemExit("--draft must be a positive integer.")
+        # Only JPEG supports draft decoding; other formats ignore the request
+        ratio = args.draft / max(src.size)
+        if ratio < 1:
+            src.draft("RGB", (math.ceil(src.width * ratio), math.ceil(src.height * ratio)))
+    if src.mode != "RGB":
+        # RGB sources (typical JPEGs) stay 3-channel; anything else goes to RGBA to keep transparency
+        src = src.convert("RGBA")
+    # Decode now: tiles are later resized from this image on several threads at once
+    src.load()
     img_w, img_h = src.size
 
     # Determine tile size
@@ -194,12 +285,12 @@ def main():
 
     if args.min_scale <= 0 or args.max_scale <= 0 or args.min_scale > args.max_scale:
         raise SystemExit("Invalid scale range.")
+    if args.workers is not None and args.workers <= 0:
+        raise SystemExit("Workers must be >= 1.")
 
     if args.save_frames_dir:
         os.makedirs(args.save_frames_dir, exist_ok=True)
 
-    frames: List[Image.Image] = []
-
     # Create a base RNG if seed provided else use a nondeterministic RNG for frames
     base_seed = args.seed
     if base_seed is None:
@@ -207,44 +298,40 @@ def main():
     else:
         master_rng = random.Random(base_seed)
 
+    # Derive per-frame seeds up front so each frame differs but is reproducible when base seed is set,
+    # regardless of which worker renders it
+    frame_seeds = [master_rng.randint(0, 2**63 - 1) for _ in range(args.frames)]
+
     if args.verbose:
         print(f"Generating {args.frames} frames, each with {args.tiles} tiles (tile size {tile_w}x{tile_h}), background={args.background}")
 
-    for fi in range(args.frames):
-        # Derive a per-frame seed to ensure each frame differs but is reproducible when base seed is set
-        frame_seed = master_rng.randint(0, 2**63 - 1)
-        frame_rng = random.Random(frame_seed)
-        if args.verbose:
-            print(f"[frame {fi}] seed={frame_seed}")
-
-        frame_img = generate_single_frame(
-            src_rgba=src,
-            img_w=img_w,
-            img_h=img_h,
-            tiles_count=args.tiles,
-            tile_w=tile_w,
-            tile_h=tile_h,
-            min_scale=args.min_scale,
-            max_scale=args.max_scale,
-            bg_color=args.background,
-            rng=frame_rng,
-            verbose=args.verbose
-        )
-
-        # Optionally save each frame PNG for inspection
-        if args.save_frames_dir:
-            frame_path = os.path.join(args.save_frames_dir, f"frame_{fi:03d}.png")
-            frame_img.save(frame_path)
-            if args.verbose:
-                print(f"  Saved intermediate frame: {frame_path}")
-
-        frames.append(frame_img)
-
-    # Convert frames to palette mode to make a compact GIF (Pillow will convert if necessary)
-    frames_for_gif = [f.convert("P", palette=Image.ADAPTIVE, colors=256) for f in frames]
+    workers = args.workers or os.cpu_count() or 1
+    settings = {
+        "tile_threads": max(1, (os.cpu_count() or 1) // workers),
+        "tiles_count": args.tiles,
+        "tile_w": tile_w,
+        "tile_h": tile_h,
+        "min_scale": args.min_scale,
+        "max_scale": args.max_scale,
+        "bg_color": bg_color,
+        "save_frames_dir": args.save_frames_dir,
+        "verbose": args.verbose,
+    }
+    # The first frame is rendered here and used to train the palette shared by all frames
+    _init_worker(src, settings)
+    settings["palette"] = _WORKER["palette"] = build_shared_palette(_draw_frame(0, frame_seeds[0]))
+    frames = [_WORKER["canvas"].quantize(palette=settings["palette"], dither=Image.Dither.FLOYDSTEINBERG)]
+
+    if workers == 1:
+        frames.extend(map(_render_frame, range(1, args.frames), frame_seeds[1:]))
+    else:
+        # Spawn (not fork) workers: this process already runs tile threads, which do not survive a fork
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+                                 initializer=_init_worker, initargs=(src, settings)) as pool:
+            frames.extend(pool.map(_render_frame, range(1, args.frames), frame_seeds[1:]))
 
     # Save GIF
-    first, rest = frames_for_gif[0], frames_for_gif[1:]
+    first, rest = frames[0], frames[1:]
     save_kwargs = {
         "save_all": True,
         "append_images": rest,
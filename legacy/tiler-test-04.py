@@ -16,13 +16,26 @@ Usage example:
 Options:
  - Duration is in milliseconds (GIF delays are quantized to 10ms steps by most encoders/viewers).
  - If frames exceeds the number of unique permutations of the tile set, permutations will repeat.
+ - --resample picks the tile filter (lanczos by default; bicubic/bilinear are cheaper and look
+   nearly the same at these magnifications).
+ - Frames only differ in layer order, so they are rendered in parallel worker processes;
+   use --workers 1 to render in-process.
 """
 from __future__ import annotations
 import argparse
+import multiprocessing
 import os
 import random
+from concurrent.futures import ProcessPoolExecutor
 from typing import Tuple, List, Dict
-from PIL import Image
+from PIL import Image, ImageColor, features
+
+# Resampling filters selectable with --resample
+RESAMPLE_FILTERS = {
+    "lanczos": Image.LANCZOS,
+    "bicubic": Image.BICUBIC,
+    "bilinear": Image.BILINEAR,
+}
 
 def parse_args():
     p = argparse.ArgumentParser(description="Create GIF frames by shuffling a fixed set of tiles sampled from one photo.")
@@ -41,6 +54,10 @@ def parse_args():
     p.add_argument("--seed", type=int, default=None)
     p.add_argument("--save-frames-dir", default=None)
     p.add_argument("--verbose", action="store_true")
+    p.add_argument("--resample", choices=sorted(RESAMPLE_FILTERS), default="lanczos",
+                   help="Filter used to magnify tiles (default lanczos).")
+    p.add_argument("--workers", type=int, default=None,
+                   help="Number of worker processes used to render frames (default: CPU count; 1 renders in-process).")
     return p.parse_args()
 
 def choose_random_tile_position(rng: random.Random, img_w: int, img_h: int, tile_w: int, tile_h: int) -> Tuple[int,int,int,int]:
@@ -52,52 +69,30 @@ def choose_random_tile_position(rng: random.Random, img_w: int, img_h: int, tile
     center_y = top + tile_h // 2
     return left, top, center_x, center_y
 
-def crop_and_scale_tile(src_img: Image.Image, left: int, top: int, tile_w: int, tile_h: int, scale: float) -> Image.Image:
-    right = left + tile_w
-    bottom = top + tile_h
-    tile = src_img.crop((left, top, right, bottom))
+def crop_and_scale_tile(src_img: Image.Image, left: int, top: int, tile_w: int, tile_h: int, scale: float,
+                        resample: int = Image.LANCZOS) -> Image.Image:
     new_w = max(1, int(round(tile_w * scale)))
     new_h = max(1, int(round(tile_h * scale)))
-    return tile.resize((new_w, new_h), resample=Image.LANCZOS)
+    box = (left, top, left + tile_w, top + tile_h)
+    if (new_w, new_h) == (tile_w, tile_h):
+        # Scale rounds to the original size: the resample would be an exact copy of the region
+        return src_img.crop(box)
+    if src_img.mode == "RGBA":
+        # Pillow premultiplies the whole RGBA image on every resize, so cut the region out first
+        return src_img.crop(box).resize((new_w, new_h), resample=resample)
+    # Resample straight from the source region instead of cropping a copy of it first
+    return src_img.resize((new_w, new_h), resample=resample, box=box)
 
-def flatten_tile_to_opaque(tile: Image.Image, bg_color: str) -> Image.Image:
+def flatten_tile_to_opaque(tile: Image.Image, bg_color: Tuple[int, int, int]) -> Image.Image:
     if tile.mode == "RGBA":
+        # Fully opaque tiles (e.g. cut from a JPEG) only need the alpha band dropped
+        if tile.getchannel("A").getextrema()[0] == 255:
+            return tile.convert("RGB")
         bg = Image.new("RGB", tile.size, bg_color)
-        bg.paste(tile, mask=tile.split()[-1])
+        bg.paste(tile, mask=tile)
         return bg
     else:
-        return tile.convert("RGB")
-
-def paste_opaque_with_center(dest: Image.Image, src: Image.Image, center_x: int, center_y: int):
-    dest_w, dest_h = dest.size
-    src_w, src_h = src.size
-    paste_x = center_x - src_w // 2
-    paste_y = center_y - src_h // 2
-
-    src_left = 0
-    src_top = 0
-    dst_left = paste_x
-    dst_top = paste_y
-
-    if paste_x < 0:
-        src_left = -paste_x
-        dst_left = 0
-    if paste_y < 0:
-        src_top = -paste_y
-        dst_top = 0
-
-    src_right = src_w
-    src_bottom = src_h
-    if paste_x + src_w > dest_w:
-        src_right = src_w - ((paste_x + src_w) - dest_w)
-    if paste_y + src_h > dest_h:
-        src_bottom = src_h - ((paste_y + src_h) - dest_h)
-
-    if src_left >= src_right or src_top >= src_bottom:
-        return
-
-    src_crop = src.crop((src_left, src_top, src_right, src_bottom))
-    dest.paste(src_crop, (dst_left, dst_top))
+        return tile if tile.mode == "RGB" else tile.convert("RGB")
 
 def generate_tiles_once(src_rgba: Image.Image,
                         tiles_count: int,
@@ -105,19 +100,22 @@ def generate_tiles_once(src_rgba: Image.Image,
                         tile_h: int,
                         min_scale: float,
                         max_scale: float,
-                        bg_color: str,
+                        bg_color: Tuple[int, int, int],
                         rng: random.Random,
+                        resample: int = Image.LANCZOS,
                         verbose: bool = False) -> List[Dict]:
     img_w, img_h = src_rgba.size
     tiles = []
     for i in range(tiles_count):
         left, top, center_x, center_y = choose_random_tile_position(rng, img_w, img_h, tile_w, tile_h)
         scale = rng.uniform(min_scale, max_scale)
-        tile_resized = crop_and_scale_tile(src_rgba, left, top, tile_w, tile_h, scale)
+        tile_resized = crop_and_scale_tile(src_rgba, left, top, tile_w, tile_h, scale, resample)
         tile_opaque = flatten_tile_to_opaque(tile_resized, bg_color)
         tiles.append({
             "img": tile_opaque,
             "center": (center_x, center_y),
+            # Top-left paste offset; fixed for the whole animation, so computed once here
+            "paste_xy": (center_x - tile_opaque.width // 2, center_y - tile_opaque.height // 2),
             "scale": scale,
             "orig_box": (left, top, left + tile_w, top + tile_h),
             "index": i,
@@ -126,13 +124,71 @@ def generate_tiles_once(src_rgba: Image.Image,
             print(f"[tile #{i}] box={left,top,tile_w,tile_h} center=({center_x},{center_y}) scale={scale:.3f} resized={tile_resized.size}")
     return tiles
 
+# Per-process render settings, filled in by _init_worker (once per worker process)
+_WORKER: Dict = {}
+
+def _init_worker(tiles: List[Dict], settings: Dict):
+    """Store the shared tiles and frame settings for this process."""
+    _WORKER.update(settings)
+    _WORKER["tiles"] = tiles
+
+def build_shared_palette(keyframe: Image.Image, colors: int = 256) -> Image.Image:
+    """
+    Quantize one representative frame and return a tiny 'P' image carrying its palette, to be
+    passed as Image.quantize(palette=...) for every frame. A single palette quantizes each frame
+    with a cheap nearest-color lookup and lets the GIF use one global color table.
+    """
+    method = Image.Quantize.LIBIMAGEQUANT if features.check_feature("libimagequant") else Image.Quantize.MEDIANCUT
+    quantized = keyframe.quantize(colors=colors, method=method)
+    palette_img = Image.new("P", (1, 1))
+    palette_img.putpalette(quantized.getpalette())
+    return palette_img
+
+def _draw_frame(fi: int, frame_seed: int, order: List[int]) -> Image.Image:
+    """Paste the tiles in the given layer order onto a fresh RGB canvas and return it."""
+    w = _WORKER
+    # Verbose lines are collected and written once per frame, so parallel workers don't interleave
+    log = [f"[frame {fi}] seed={frame_seed} order={order}"] if w["verbose"] else None
+
+    canvas = Image.new("RGB", w["size"], w["bg_color"])
+    # paste tiles in this order (later tiles overwrite earlier ones)
+    for layer_pos, idx in enumerate(order):
+        entry = w["tiles"][idx]
+        canvas.paste(entry["img"], entry["paste_xy"])
+        if log is not None:
+            log.append(f"  pasted layer {layer_pos} -> tile#{entry['index']} center={entry['center']} size={entry['img'].size}")
+
+    if w["save_frames_dir"]:
+        frame_path = os.path.join(w["save_frames_dir"], f"frame_{fi:03d}.png")
+        canvas.save(frame_path)
+        if log is not None:
+            log.append(f"  saved frame PNG: {frame_path}")
+
+    if log is not None:
+        print("\n".join(log), flush=True)
+    return canvas
+
+def _render_frame(fi: int, frame_seed: int, order: List[int]) -> Image.Image:
+    """Draw frame fi and quantize it to the shared GIF palette."""
+    return _draw_frame(fi, frame_seed, order).quantize(palette=_WORKER["palette"], dither=Image.Dither.FLOYDSTEINBERG)
+
 def main():
     args = parse_args()
+    try:
+        # Parse the color once; tiles and canvases then get a ready RGB tuple instead of a string
+        bg_color = ImageColor.getcolor(args.background, "RGB")
+    except ValueError:
+        raise SystemExit(f"Invalid --background color: {args.background}")
 
     if not os.path.exists(args.input_path):
         raise SystemExit(f"Input file not found: {args.input_path}")
 
-    src = Image.open(args.input_path).convert("RGBA")
+    src = Image.open(args.input_path)
+    if src.mode != "RGB":
+        src = src.convert("RGBA")
+        if src.getchannel("A").getextrema()[0] == 255:
+            # Nothing is actually transparent: work in RGB so tiles need no alpha flattening
+            src = src.convert("RGB")
     img_w, img_h = src.size
 
     # tile sizing
@@ -152,6 +208,8 @@ def main():
         raise SystemExit("Tiles must be >= 1.")
     if args.frames <= 0:
         raise SystemExit("Frames must be >= 1.")
+    if args.workers is not None and args.workers <= 0:
+        raise SystemExit("Workers must be >= 1.")
 
     if args.save_frames_dir:
         os.makedirs(args.save_frames_dir, exist_ok=True)
@@ -170,42 +228,43 @@ def main():
         tile_h=tile_h,
         min_scale=args.min_scale,
         max_scale=args.max_scale,
-        bg_color=args.background,
+        bg_color=bg_color,
         rng=master_rng,
+        resample=RESAMPLE_FILTERS[args.resample],
         verbose=args.verbose
     )
 
     if args.verbose:
         print(f"Generated {len(tiles)} tiles once; producing {args.frames} frames by shuffling their order.")
 
-    frames = []
-    for fi in range(args.frames):
-        # derive a reproducible per-frame RNG from master_rng so GIF is reproducible with a single seed
-        frame_seed = master_rng.randint(0, 2**63 - 1)
-        frame_rng = random.Random(frame_seed)
+    # Derive every frame's layer order up front (a reproducible per-frame RNG from master_rng so the
+    # GIF is reproducible with a single seed), independent of which worker renders the frame
+    frame_seeds = [master_rng.randint(0, 2**63 - 1) for _ in range(args.frames)]
+    orders = []
+    for frame_seed in frame_seeds:
         order = list(range(len(tiles)))
-        frame_rng.shuffle(order)
-        if args.verbose:
-            print(f"[frame {fi}] seed={frame_seed} order={order}")
-
-        canvas = Image.new("RGB", (img_w, img_h), args.background)
-        # paste tiles in this order (later tiles overwrite earlier ones)
-        for layer_pos, idx in enumerate(order):
-            entry = tiles[idx]
-            paste_opaque_with_center(canvas, entry["img"], entry["center"][0], entry["center"][1])
-            if args.verbose:
-                print(f"  pasted layer {layer_pos} -> tile#{entry['index']} center={entry['center']} size={entry['img'].size}")
-
-        if args.save_frames_dir:
-            frame_path = os.path.join(args.save_frames_dir, f"frame_{fi:03d}.png")
-            canvas.save(frame_path)
-            if args.verbose:
-                print(f"  saved frame PNG: {frame_path}")
-
-        frames.append(canvas)
-
-    # Convert to palette mode for GIF
-    frames_for_gif = [f.convert("P", palette=Image.ADAPTIVE, colors=256) for f in frames]
+        random.Random(frame_seed).shuffle(order)
+        orders.append(order)
+
+    settings = {
+        "size": (img_w, img_h),
+        "bg_color": bg_color,
+        "save_frames_dir": args.save_frames_dir,
+        "verbose": args.verbose,
+    }
+    # The first frame is drawn here and used to train the palette shared by all frames
+    _init_worker(tiles, settings)
+    first_rgb = _draw_frame(0, frame_seeds[0], orders[0])
+    settings["palette"] = _WORKER["palette"] = build_shared_palette(first_rgb)
+    frames_for_gif = [first_rgb.quantize(palette=settings["palette"], dither=Image.Dither.FLOYDSTEINBERG)]
+
+    if args.workers == 1:
+        frames_for_gif.extend(map(_render_frame, range(1, args.frames), frame_seeds[1:], orders[1:]))
+    else:
+        with ProcessPoolExecutor(max_workers=args.workers, mp_context=multiprocessing.get_context("spawn"),
+                                 initializer=_init_worker, initargs=(tiles, settings)) as pool:
+            frames_for_gif.extend(pool.map(_render_frame, range(1, args.frames), frame_seeds[1:], orders[1:]))
+
     first, rest = frames_for_gif[0], frames_for_gif[1:]
     save_kwargs = {
         "save_all": True,
@@ -215,7 +274,7 @@ def main():
         "optimize": False,
     }
     first.save(args.output_gif, format="GIF", **save_kwargs)
-    print(f"Saved GIF: {args.output_gif} ({img_w}x{img_h}), frames={len(frames)}, tiles={len(tiles)}, duration={args.duration}ms loop={args.loop}")
+    print(f"Saved GIF: {args.output_gif} ({img_w}x{img_h}), frames={len(frames_for_gif)}, tiles={len(tiles)}, duration={args.duration}ms loop={args.loop}")
 
 if __name__ == "__main__":
     main()
@@ -18,10 +18,14 @@ Usage example:
 
 Notes:
  - Duration is in milliseconds per frame.
+ - Frames are rendered in parallel worker processes once all layer orders and animation targets
+   are drawn; use --workers 1 to render in-process.
  - If --unique-permutations is used and the number of tiles is small enough, the script will
    enumerate permutations and sample without repeats. If that's impractical, it will try to
    generate unique permutations by random shuffling (with a pragmatic attempt limit).
  - Animated tiles are re-resized per-frame from the source image (so quality is preserved).
+   Those per-frame resizes use --anim-resample (bicubic by default: they are transient and far
+   cheaper than lanczos); the tiles generated once use --resample (lanczos by default).
  - All tiles are flattened to opaque RGB using --background so final frames have no transparency.
 
 Dependencies:
@@ -29,13 +33,21 @@ Dependencies:
 """
 from __future__ import annotations
 import argparse
-import itertools
 import math
 import os
+import multiprocessing
 import random
 import sys
+from concurrent.futures import ProcessPoolExecutor
 from typing import Dict, List, Tuple
-from PIL import Image
+from PIL import Image, ImageColor, features
+
+# Resampling filters selectable with --resample
+RESAMPLE_FILTERS = {
+    "lanczos": Image.LANCZOS,
+    "bicubic": Image.BICUBIC,
+    "bilinear": Image.BILINEAR,
+}
 
 def parse_args():
     p = argparse.ArgumentParser(description="Create GIF frames by shuffling a fixed set of tiles, with optional unique permutations and animating a subset of tiles.")
@@ -54,6 +66,12 @@ def parse_args():
     p.add_argument("--seed", type=int, default=None)
     p.add_argument("--save-frames-dir", default=None)
     p.add_argument("--verbose", action="store_true")
+    p.add_argument("--resample", choices=sorted(RESAMPLE_FILTERS), default="lanczos",
+                   help="Filter used to magnify the tiles generated once (default lanczos).")
+    p.add_argument("--anim-resample", choices=sorted(RESAMPLE_FILTERS), default="bicubic",
+                   help="Filter used for the per-frame resizes of animated tiles (default bicubic).")
+    p.add_argument("--workers", type=int, default=None,
+                   help="Number of worker processes used to render frames (default: CPU count; 1 renders in-process).")
 
     # New options:
     p.add_argument("--unique-permutations", action="store_true",
@@ -75,64 +93,57 @@ def choose_random_tile_position(rng: random.Random, img_w: int, img_h: int, tile
     center_y = top + tile_h // 2
     return left, top, center_x, center_y
 
-def crop_and_scale_tile_from_src(src_img: Image.Image, left: int, top: int, tile_w: int, tile_h: int, scale: float) -> Image.Image:
-    right = left + tile_w
-    bottom = top + tile_h
-    tile = src_img.crop((left, top, right, bottom))
+def crop_and_scale_tile_from_src(src_img: Image.Image, left: int, top: int, tile_w: int, tile_h: int, scale: float,
+                                 resample: int = Image.LANCZOS) -> Image.Image:
     new_w = max(1, int(round(tile_w * scale)))
     new_h = max(1, int(round(tile_h * scale)))
-    return tile.resize((new_w, new_h), resample=Image.LANCZOS)
-
-def flatten_tile_to_opaque(tile: Image.Image, bg_color: str) -> Image.Image:
+    box = (left, top, left + tile_w, top + tile_h)
+    if (new_w, new_h) == (tile_w, tile_h):
+        # Scale rounds to the original size: the resample would be an exact copy of the region
+        return src_img.crop(box)
+    if src_img.mode == "RGBA":
+        # Pillow premultiplies the whole RGBA image on every resize, so cut the region out first
+        return src_img.crop(box).resize((new_w, new_h), resample=resample)
+    # Resample straight from the source region instead of cropping a copy of it first
+    return src_img.resize((new_w, new_h), resample=resample, box=box)
+
+def flatten_tile_to_opaque(tile: Image.Image, bg_color: Tuple[int, int, int]) -> Image.Image:
     if tile.mode == "RGBA":
+        # Fully opaque tiles (e.g. cut from a JPEG) only need the alpha band dropped
+        if tile.getchannel("A").getextrema()[0] == 255:
+            return tile.convert("RGB")
         bg = Image.new("RGB", tile.size, bg_color)
-        bg.paste(tile, mask=tile.split()[-1])
+        bg.paste(tile, mask=tile)
         return bg
     else:
-        return tile.convert("RGB")
+        return tile if tile.mode == "RGB" else tile.convert("RGB")
 
 def paste_opaque_with_center(dest: Image.Image, src: Image.Image, center_x: int, center_y: int):
-    dest_w, dest_h = dest.size
+    # Image.paste clips whatever falls outside dest itself; no intermediate crop is needed
     src_w, src_h = src.size
-    paste_x = center_x - src_w // 2
-    paste_y = center_y - src_h // 2
-
-    src_left = 0
-    src_top = 0
-    dst_left = paste_x
-    dst_top = paste_y
-
-    if paste_x < 0:
-        src_left = -paste_x
-        dst_left = 0
-    if paste_y < 0:
-        src_top = -paste_y
-        dst_top = 0
-
-    src_right = src_w
-    src_bottom = src_h
-    if paste_x + src_w > dest_w:
-        src_right = src_w - ((paste_x + src_w) - dest_w)
-    if paste_y + src_h > dest_h:
-        src_bottom = src_h - ((paste_y + src_h) - dest_h)
-
-    if src_left >= src_right or src_top >= src_bottom:
-        return
-
-    src_crop = src.crop((src_left, src_top, src_right, src_bottom))
-    dest.paste(src_crop, (dst_left, dst_top))
+    dest.paste(src, (center_x - src_w // 2, center_y - src_h // 2))
 
 def factorial(n: int) -> int:
     return math.factorial(n)
 
+def permutation_from_rank(rank: int, n: int) -> List[int]:
+    """Decode rank (0 <= rank < n!) into the rank-th lexicographic permutation of range(n) (Lehmer code)."""
+    remaining = list(range(n))
+    perm = []
+    for i in range(n - 1, -1, -1):
+        digit, rank = divmod(rank, factorial(i))
+        perm.append(remaining.pop(digit))
+    return perm
+
 def generate_tiles_once(src_rgba: Image.Image,
                         tiles_count: int,
                         tile_w: int,
                         tile_h: int,
                         min_scale: float,
                         max_scale: float,
-                        bg_color: str,
+                        bg_color: Tuple[int, int, int],
                         rng: random.Random,
+                        resample: int = Image.LANCZOS,
                         verbose: bool = False) -> List[Dict]:
     img_w, img_h = src_rgba.size
     tiles = []
@@ -140,7 +151,7 @@ def generate_tiles_once(src_rgba: Image.Image,
         left, top, center_x, center_y = choose_random_tile_position(rng, img_w, img_h, tile_w, tile_h)
         scale = rng.uniform(min_scale, max_scale)
         # Keep base parameters; we'll precompute an opaque "static" image for non-animated tiles.
-        tile_resized = crop_and_scale_tile_from_src(src_rgba, left, top, tile_w, tile_h, scale)
+        tile_resized = crop_and_scale_tile_from_src(src_rgba, left, top, tile_w, tile_h, scale, resample)
         tile_opaque = flatten_tile_to_opaque(tile_resized, bg_color)
         tiles.append({
             "index": i,
@@ -151,6 +162,8 @@ def generate_tiles_once(src_rgba: Image.Image,
             "base_center": (center_x, center_y),
             "base_scale": scale,
             "static_img": tile_opaque,  # opaque precomputed image for the base scale
+            # Top-left paste offset of static_img; only animated tiles move, so computed once here
+            "static_xy": (center_x - tile_opaque.width // 2, center_y - tile_opaque.height // 2),
             "orig_box": (left, top, left + tile_w, top + tile_h),
         })
         if verbose:
@@ -160,24 +173,24 @@ def generate_tiles_once(src_rgba: Image.Image,
 def build_unique_orders(tiles_n: int, frames: int, rng: random.Random, verbose: bool = False) -> List[List[int]]:
     """
     Build a list of permutation orders.
-    If possible and practical, enumerate all permutations and sample without replacement.
+    If practical, sample distinct permutation ranks without replacement and decode only those, so the
+    n! permutations are never materialized.
     Otherwise try to generate unique permutations by shuffling until frames are collected or attempts exhausted.
     """
-    max_enum = 200_000  # don't enumerate more than this many permutations
     orders: List[List[int]] = []
 
     total_perms = factorial(tiles_n)
     if verbose:
         print(f"[perm] tiles={tiles_n} total_perms={total_perms}, requested frames={frames}")
 
-    if frames <= total_perms and total_perms <= max_enum:
-        # enumerate all permutations and sample frames many
+    # rng.sample needs len(range(total_perms)) to fit in a C ssize_t, i.e. up to 20 tiles
+    if total_perms <= sys.maxsize:
         if verbose:
-            print("[perm] enumerating all permutations and sampling without replacement")
-        all_perms = list(itertools.permutations(range(tiles_n)))
-        rng.shuffle(all_perms)
-        for p in all_perms[:frames]:
-            orders.append(list(p))
+            print("[perm] sampling permutation ranks without replacement")
+        for rank in rng.sample(range(total_perms), min(frames, total_perms)):
+            orders.append(permutation_from_rank(rank, tiles_n))
+        if len(orders) < frames and verbose:
+            print(f"[perm] Warning: only {total_perms} unique permutations exist.")
         return orders
 
     # Fallback: try to generate unique permutations by random shuffles
@@ -203,8 +216,108 @@ def ease_smooth_sine(t: float) -> float:
     # Smooth sinusoidal easing from 0..1: 0.5 * (1 - cos(pi * t)) gives ease-in-out over [0,1]
     return 0.5 * (1 - math.cos(math.pi * t))
 
+# Per-process render state, filled in by _init_worker (once per worker process)
+_WORKER: Dict = {}
+
+def _init_worker(src: Image.Image, tiles: List[Dict], anim_specs: Dict[int, Dict], settings: Dict):
+    """Store the source image (needed to re-resize animated tiles), tiles, animation specs and settings."""
+    _WORKER.update(settings)
+    _WORKER["src"] = src
+    _WORKER["tiles"] = tiles
+    _WORKER["anim_specs"] = anim_specs
+    # Opaque animated-tile images keyed by (tile index, width, height); eased scales often round to
+    # the same size on neighbouring frames (the easing is flat near both ends)
+    _WORKER["anim_cache"] = {}
+
+def build_shared_palette(keyframe: Image.Image, colors: int = 256) -> Image.Image:
+    """
+    Quantize one representative frame and return a tiny 'P' image carrying its palette, to be
+    passed as Image.quantize(palette=...) for every frame. A single palette quantizes each frame
+    with a cheap nearest-color lookup and lets the GIF use one global color table.
+    """
+    method = Image.Quantize.LIBIMAGEQUANT if features.check_feature("libimagequant") else Image.Quantize.MEDIANCUT
+    quantized = keyframe.quantize(colors=colors, method=method)
+    palette_img = Image.new("P", (1, 1))
+    palette_img.putpalette(quantized.getpalette())
+    return palette_img
+
+def _draw_frame(fi: int, order: List[int]) -> Image.Image:
+    """Compose frame fi with the given layer order on a fresh RGB canvas and return it."""
+    w = _WORKER
+    tiles = w["tiles"]
+    frames_n = w["frames"]
+    # Verbose lines are collected and written once per frame, so parallel workers don't interleave
+    log = [f"[frame] generating frame {fi+1}/{frames_n}"] if w["verbose"] else None
+
+    # Create canvas
+    canvas = Image.new("RGB", w["src"].size, w["bg_color"])
+
+    # Compute per-frame images for animated tiles (others use precomputed static_img)
+    per_frame_imgs: Dict[int, Image.Image] = {}
+
+    for idx, spec in w["anim_specs"].items():
+        t_tile = tiles[idx]
+        # normalized time 0..1 across frames; for smooth loop use sine easing with full-period
+        if frames_n == 1:
+            tt = 0.0
+        else:
+            tt = fi / (frames_n - 1)
+        eased = ease_smooth_sine(tt)  # 0..1
+        # compute center offset and scale at this frame
+        cx_base, cy_base = t_tile["base_center"]
+        cx = int(round(cx_base + spec["dx"] * eased))
+        cy = int(round(cy_base + spec["dy"] * eased))
+        scale = t_tile["base_scale"] + (spec["scale_target"] - t_tile["base_scale"]) * eased
+
+        # crop and resize from source to keep quality, unless this size was already rendered
+        key = (idx, max(1, int(round(t_tile["tile_w"] * scale))), max(1, int(round(t_tile["tile_h"] * scale))))
+        img_opaque = w["anim_cache"].get(key)
+        if img_opaque is None:
+            img_resized = crop_and_scale_tile_from_src(w["src"], t_tile["left"], t_tile["top"], t_tile["tile_w"], t_tile["tile_h"], scale,
+                                                       w["anim_resample"])
+            img_opaque = w["anim_cache"][key] = flatten_tile_to_opaque(img_resized, w["bg_color"])
+        per_frame_imgs[idx] = {
+            "img": img_opaque,
+            "center": (cx, cy),
+        }
+        if log is not None:
+            log.append(f"  [anim] tile#{idx} frame#{fi} center=({cx},{cy}) scale={scale:.3f} size={img_opaque.size}")
+
+    # Paste tiles in the order specified for this frame
+    for layer_pos, idx in enumerate(order):
+        if idx in per_frame_imgs:
+            entry_img = per_frame_imgs[idx]["img"]
+            cx, cy = per_frame_imgs[idx]["center"]
+            paste_opaque_with_center(canvas, entry_img, cx, cy)
+        else:
+            entry_img = tiles[idx]["static_img"]
+            cx, cy = tiles[idx]["base_center"]
+            canvas.paste(entry_img, tiles[idx]["static_xy"])
+        if log is not None:
+            log.append(f"   [paste] layer {layer_pos} -> tile#{idx} center=({cx},{cy}) size={entry_img.size}")
+
+    # Optionally save intermediate frame
+    if w["save_frames_dir"]:
+        frame_path = os.path.join(w["save_frames_dir"], f"frame_{fi:03d}.png")
+        canvas.save(frame_path)
+        if log is not None:
+            log.append(f"  saved frame PNG: {frame_path}")
+
+    if log is not None:
+        print("\n".join(log), flush=True)
+    return canvas
+
+def _render_frame(fi: int, order: List[int]) -> Image.Image:
+    """Draw frame fi and quantize it to the shared GIF palette."""
+    return _draw_frame(fi, order).quantize(palette=_WORKER["palette"], dither=Image.Dither.FLOYDSTEINBERG)
+
 def main():
     args = parse_args()
+    try:
+        # Parse the color once; tiles and canvases then get a ready RGB tuple instead of a string
+        bg_color = ImageColor.getcolor(args.background, "RGB")
+    except ValueError:
+        raise SystemExit(f"Invalid --background color: {args.background}")
 
     if not os.path.exists(args.input_path):
         raise SystemExit(f"Input file not found: {args.input_path}")
@@ -216,11 +329,18 @@ def main():
         raise SystemExit("animate-count must be between 0 and --tiles")
     if args.min_scale <= 0 or args.max_scale <= 0 or args.min_scale > args.max_scale:
         raise SystemExit("Invalid scale range")
+    if args.workers is not None and args.workers <= 0:
+        raise SystemExit("workers must be >= 1")
 
     # Prepare RNG
     master_rng = random.Random(args.seed) if args.seed is not None else random.Random()
 
-    src = Image.open(args.input_path).convert("RGBA")
+    src = Image.open(args.input_path)
+    if src.mode != "RGB":
+        src = src.convert("RGBA")
+        if src.getchannel("A").getextrema()[0] == 255:
+            # Nothing is actually transparent: work in RGB so tiles need no alpha flattening
+            src = src.convert("RGB")
     img_w, img_h = src.size
 
     # Determine tile size
@@ -246,8 +366,9 @@ def main():
         tile_h=tile_h,
         min_scale=args.min_scale,
         max_scale=args.max_scale,
-        bg_color=args.background,
+        bg_color=bg_color,
         rng=master_rng,
+        resample=RESAMPLE_FILTERS[args.resample],
         verbose=args.verbose
     )
 
@@ -307,66 +428,26 @@ def main():
                 print(f"[frame-order] frame={fi} seed={frame_seed} order={order}")
 
     # Generate frames
-    frames: List[Image.Image] = []
-    for fi in range(args.frames):
-        if args.verbose:
-            print(f"[frame] generating frame {fi+1}/{args.frames}")
-
-        # Create canvas
-        canvas = Image.new("RGB", (img_w, img_h), args.background)
-
-        # Compute per-frame images for animated tiles (others use precomputed static_img)
-        per_frame_imgs: Dict[int, Image.Image] = {}
-
-        for idx in animate_indices:
-            spec = anim_specs[idx]
-            t_tile = tiles[idx]
-            # normalized time 0..1 across frames; for smooth loop use sine easing with full-period
-            if args.frames == 1:
-                tt = 0.0
-            else:
-                tt = fi / (args.frames - 1)
-            eased = ease_smooth_sine(tt)  # 0..1
-            # compute center offset and scale at this frame
-            cx_base, cy_base = t_tile["base_center"]
-            cx = int(round(cx_base + spec["dx"] * eased))
-            cy = int(round(cy_base + spec["dy"] * eased))
-            scale = t_tile["base_scale"] + (spec["scale_target"] - t_tile["base_scale"]) * eased
-
-            # crop and resize from source to keep quality
-            img_resized = crop_and_scale_tile_from_src(src, t_tile["left"], t_tile["top"], t_tile["tile_w"], t_tile["tile_h"], scale)
-            img_opaque = flatten_tile_to_opaque(img_resized, args.background)
-            per_frame_imgs[idx] = {
-                "img": img_opaque,
-                "center": (cx, cy),
-            }
-            if args.verbose:
-                print(f"  [anim] tile#{idx} frame#{fi} center=({cx},{cy}) scale={scale:.3f} size={img_opaque.size}")
-
-        # Paste tiles in the order specified for this frame
-        order = orders[fi]
-        for layer_pos, idx in enumerate(order):
-            if idx in per_frame_imgs:
-                entry_img = per_frame_imgs[idx]["img"]
-                cx, cy = per_frame_imgs[idx]["center"]
-            else:
-                entry_img = tiles[idx]["static_img"]
-                cx, cy = tiles[idx]["base_center"]
-            paste_opaque_with_center(canvas, entry_img, cx, cy)
-            if args.verbose:
-                print(f"   [paste] layer {layer_pos} -> tile#{idx} center=({cx},{cy}) size={entry_img.size}")
-
-        # Optionally save intermediate frame
-        if args.save_frames_dir:
-            frame_path = os.path.join(args.save_frames_dir, f"frame_{fi:03d}.png")
-            canvas.save(frame_path)
-            if args.verbose:
-                print(f"  saved frame PNG: {frame_path}")
-
-        frames.append(canvas)
+    settings = {
+        "frames": args.frames,
+        "anim_resample": RESAMPLE_FILTERS[args.anim_resample],
+        "bg_color": bg_color,
+        "save_frames_dir": args.save_frames_dir,
+        "verbose": args.verbose,
+    }
+    # The first frame is drawn here and used to train the palette shared by all frames
+    _init_worker(src, tiles, anim_specs, settings)
+    first_rgb = _draw_frame(0, orders[0])
+    settings["palette"] = _WORKER["palette"] = build_shared_palette(first_rgb)
+    frames_for_gif = [first_rgb.quantize(palette=settings["palette"], dither=Image.Dither.FLOYDSTEINBERG)]
+
+    if args.workers == 1:
+        frames_for_gif.extend(map(_render_frame, range(1, args.frames), orders[1:]))
+    else:
+        with ProcessPoolExecutor(max_workers=args.workers, mp_context=multiprocessing.get_context("spawn"),
+                                 initializer=_init_worker, initargs=(src, tiles, anim_specs, settings)) as pool:
+            frames_for_gif.extend(pool.map(_render_frame, range(1, args.frames), orders[1:]))
 
-    # Convert frames for GIF and save
-    frames_for_gif = [f.convert("P", palette=Image.ADAPTIVE, colors=256) for f in frames]
     first, rest = frames_for_gif[0], frames_for_gif[1:]
     save_kwargs = {
         "save_all": True,
@@ -377,7 +458,7 @@ def main():
     }
     first.save(args.output_gif, format="GIF", **save_kwargs)
 
-    print(f"Saved GIF: {args.output_gif} ({img_w}x{img_h}), frames={len(frames)}, tiles={len(tiles)}, duration={args.duration}ms loop={args.loop}")
+    print(f"Saved GIF: {args.output_gif} ({img_w}x{img_h}), frames={len(frames_for_gif)}, tiles={len(tiles)}, duration={args.duration}ms loop={args.loop}")
     if args.save_frames_dir:
         print(f"Intermediate frames saved to: {args.save_frames_dir}")
 
@@ -12,27 +12,18 @@ from __future__ import annotations
 import argparse
 import random
 from pathlib import Path
-from typing import Tuple
+from typing import TYPE_CHECKING
 
-from PIL import Image
-
-import tiler_toolkit as tt
-
-
-def _parse_tile_size(args: argparse.Namespace, img_size: Tuple[int, int]) -> Tuple[int, int]:
-    img_w, img_h = img_size
-    if args.tile_width and args.tile_height:
-        return args.tile_width, args.tile_height
-    base = int(round(min(img_w, img_h) * args.tile_size))
-    return args.tile_width or base, args.tile_height or base
+# Pillow and the toolkit are imported inside the commands so --help and argument errors stay fast
+if TYPE_CHECKING:
+    from PIL import Image
 
 
 def _load_source_image(args: argparse.Namespace) -> Image.Image:
-    img = Image.open(args.input).convert("RGBA")
-    if args.input_scale is None and args.input_width is None and args.input_height is None:
-        return img
-    return tt.rescale_image(
-        img,
+    import tiler_toolkit as tt
+
+    return tt.load_source(
+        args.input,
         width=args.input_width,
         height=args.input_height,
         scale=args.input_scale,
@@ -73,8 +64,10 @@ def _add_common_tile_args(parser: argparse.ArgumentParser, default_tile_size: fl
 
 
 def cmd_single(args: argparse.Namespace):
+    import tiler_toolkit as tt
+
     img = _load_source_image(args)
-    tile_w, tile_h = _parse_tile_size(args, img.size)
+    tile_w, tile_h = tt.resolve_tile_size(img.size, args.tile_size, args.tile_width, args.tile_height)
     rng = random.Random(args.seed) if args.seed is not None else None
     result = tt.build_single_tile(
         img,
@@ -92,8 +85,10 @@ def cmd_single(args: argparse.Namespace):
 
 
 def cmd_layers(args: argparse.Namespace):
+    import tiler_toolkit as tt
+
     img = _load_source_image(args)
-    tile_w, tile_h = _parse_tile_size(args, img.size)
+    tile_w, tile_h = tt.resolve_tile_size(img.size, args.tile_size, args.tile_width, args.tile_height)
     rng = random.Random(args.seed) if args.seed is not None else random.Random()
     result = tt.build_layered_tiles(
         img,
@@ -106,6 +101,7 @@ def cmd_layers(args: argparse.Namespace):
         tile_filter=args.tile_filter,
         rng=rng,
         verbose=args.verbose,
+        jobs=args.jobs,
     )
     Path(args.output).parent.mkdir(parents=True, exist_ok=True)
     result.save(args.output)
@@ -113,9 +109,11 @@ def cmd_layers(args: argparse.Namespace):
 
 
 def cmd_gif(args: argparse.Namespace):
+    import tiler_toolkit as tt
+
     img = _load_source_image(args)
-    tile_w, tile_h = _parse_tile_size(args, img.size)
-    frames = tt.build_animation_frames(
+    tile_w, tile_h = tt.resolve_tile_size(img.size, args.tile_size, args.tile_width, args.tile_height)
+    frames = tt.iter_animation_frames(
         img,
         frames=args.frames,
         tiles_per_frame=args.tiles,
@@ -127,25 +125,33 @@ def cmd_gif(args: argparse.Namespace):
         tile_filter=args.tile_filter,
         seed=args.seed,
         verbose=args.verbose,
+        jobs=args.jobs,
     )
     tt.save_animation(frames, args.output, fps=args.fps)
     print(f"Saved animation with {args.frames} frames -> {args.output}")
 
 
 def cmd_upscale(args: argparse.Namespace):
+    from PIL import Image
+
+    import tiler_toolkit as tt
+
     img = Image.open(args.input)
-    kwargs = {
-        "mode": args.mode,
-        "filter_name": args.filter,
-        "background": args.background,
-    }
+    src_w, src_h = img.size
     if args.scale:
-        kwargs["scale"] = args.scale
+        width, height = int(round(src_w * args.scale)), int(round(src_h * args.scale))
     else:
-        kwargs["width"] = args.width
-        kwargs["height"] = args.height
+        width, height = args.width, args.height
+    tt.draft_for_target(img, width, height)
 
-    result = tt.upscale_image(img, **kwargs)
+    result = tt.upscale_image(
+        img,
+        width=width,
+        height=height,
+        mode=args.mode,
+        filter_name=args.filter,
+        background=args.background,
+    )
     Path(args.output).parent.mkdir(parents=True, exist_ok=True)
     result.save(args.output)
     print(f"Upscaled image saved -> {args.output}")
@@ -165,6 +171,12 @@ def build_parser() -> argparse.ArgumentParser:
     _add_common_tile_args(layers, default_tile_size=0.2)
     layers.add_argument("--count", type=int, default=5, help="Number of tiles to generate")
     layers.add_argument("--verbose", action="store_true")
+    layers.add_argument(
+        "--jobs",
+        type=int,
+        default=1,
+        help="Worker processes used to render tiles (default: 1 renders in-process)",
+    )
     layers.set_defaults(func=cmd_layers)
 
     # gif
@@ -174,6 +186,12 @@ def build_parser() -> argparse.ArgumentParser:
     gif.add_argument("--tiles", type=int, default=6, help="Tiles per frame")
     gif.add_argument("--fps", type=int, default=6)
     gif.add_argument("--verbose", action="store_true")
+    gif.add_argument(
+        "--jobs",
+        type=int,
+        default=None,
+        help="Worker processes used to render frames (default: CPU count; 1 renders in-process)",
+    )
     gif.set_defaults(func=cmd_gif)
 
     # upscale
@@ -203,6 +221,9 @@ def main(argv: list[str] | None = None):
         if args.input_scale is None and ((args.input_width is None) != (args.input_height is None)):
             parser.error("Pre-scaling requires both --input-width and --input-height when --input-scale is omitted")
 
+    if args.command in {"layers", "gif"} and args.jobs is not None and args.jobs <= 0:
+        parser.error("--jobs must be a positive integer")
+
     if args.command == "upscale" and not args.scale and (args.width is None or args.height is None):
         parser.error("upscale requires --scale or both --width and --height")
 
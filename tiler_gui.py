@@ -2,65 +2,94 @@
 """Lightweight Tkinter GUI for running tiler workflows locally."""
 from __future__ import annotations
 
+import queue
 import random
+import threading
 import tkinter as tk
+from functools import lru_cache
 from pathlib import Path
 from tkinter import filedialog, messagebox, ttk
-from typing import Optional
+from typing import TYPE_CHECKING, Optional
 
-from PIL import Image
-
-import tiler_toolkit as tt
+# Pillow and the toolkit are imported on first run so the window opens without waiting on them
+if TYPE_CHECKING:
+    from PIL import Image
 
 RESAMPLE_CHOICES = ["nearest", "bilinear", "bicubic", "lanczos"]
 UPSCALE_MODES = ["fit", "fill", "stretch"]
 
 
-def _parse_int(value: str) -> Optional[int]:
-    value = value.strip()
-    if not value:
-        return None
-    return int(value)
-
-
-def _parse_float(value: str) -> Optional[float]:
-    value = value.strip()
-    if not value:
-        return None
-    return float(value)
-
-
-def _parse_seed(value: str) -> Optional[int]:
-    return _parse_int(value)
-
-
-def _rescale_if_needed(img: Image.Image, scale_var: tk.StringVar, width_var: tk.StringVar, height_var: tk.StringVar, filter_var: tk.StringVar) -> Image.Image:
-    scale = _parse_float(scale_var.get())
-    width = _parse_int(width_var.get())
-    height = _parse_int(height_var.get())
-
-    if scale is None and width is None and height is None:
-        return img
-
+# Numeric form fields: parser and the value used when the field is left blank
+_SCHEMA: dict[str, tuple[type, Optional[float]]] = {
+    "input_scale": (float, None),
+    "input_width": (int, None),
+    "input_height": (int, None),
+    "tile_size": (float, 0.25),
+    "tile_width": (int, None),
+    "tile_height": (int, None),
+    "min_scale": (float, 1.2),
+    "max_scale": (float, 1.6),
+    "seed": (int, None),
+    "count": (int, 5),
+    "frames": (int, 12),
+    "tiles": (int, 6),
+    "fps": (int, 6),
+    "width": (int, None),
+    "height": (int, None),
+    "scale": (float, None),
+}
+_TILE_FIELDS = ("input_scale", "input_width", "input_height", "tile_size", "tile_width", "tile_height", "min_scale", "max_scale", "seed")
+_MODE_FIELDS = {
+    "single": _TILE_FIELDS,
+    "layers": _TILE_FIELDS + ("count",),
+    "gif": _TILE_FIELDS + ("frames", "tiles", "fps"),
+    "upscale": ("width", "height", "scale"),
+}
+
+
+def _parse_state(values: dict[str, str], keys: tuple[str, ...]) -> dict[str, Optional[float]]:
+    """Parse the numeric fields ``keys`` in one pass, substituting schema defaults for blanks."""
+    parsed: dict[str, Optional[float]] = {}
+    for key in keys:
+        kind, default = _SCHEMA[key]
+        text = values[key].strip()
+        if not text:
+            parsed[key] = default
+            continue
+        try:
+            parsed[key] = kind(text)
+        except ValueError:
+            raise ValueError(f"Invalid {kind.__name__} for {key.replace('_', ' ')}: {text!r}") from None
+    return parsed
+
+
+def _check_pre_scale(scale: Optional[float], width: Optional[int], height: Optional[int]):
     if scale is not None and (width is not None or height is not None):
         raise ValueError("Provide either input scale or both input width/height, not both.")
 
-    if scale is None and (width is None or height is None):
+    if scale is None and (width is None) != (height is None):
         raise ValueError("Input width and height are both required when scale is omitted.")
 
-    return tt.rescale_image(img, width=width, height=height, scale=scale, filter_name=filter_var.get())
 
+@lru_cache(maxsize=2)
+def _load_source(
+    path: str,
+    mtime_ns: int,
+    file_size: int,
+    scale: Optional[float],
+    width: Optional[int],
+    height: Optional[int],
+    filter_name: str,
+) -> Image.Image:
+    """Decode and optionally pre-scale the input.
 
-def _compute_tile_size(img: Image.Image, tile_size_var: tk.StringVar, tile_w_var: tk.StringVar, tile_h_var: tk.StringVar) -> tuple[int, int]:
-    img_w, img_h = img.size
-    tile_w = _parse_int(tile_w_var.get())
-    tile_h = _parse_int(tile_h_var.get())
-    if tile_w is not None and tile_h is not None:
-        return tile_w, tile_h
+    Cached on the file's path, mtime and size plus the pre-scale settings, so re-running with
+    different tile settings skips the decode and resample. The tile builders only read from the
+    returned image.
+    """
+    import tiler_toolkit as tt
 
-    fraction = float(tile_size_var.get() or 0.25)
-    base = int(round(min(img_w, img_h) * fraction))
-    return tile_w or base, tile_h or base
+    return tt.load_source(path, width=width, height=height, scale=scale, filter_name=filter_name)
 
 
 def _save_image(result: Image.Image, output_path: Path):
@@ -68,99 +97,124 @@ def _save_image(result: Image.Image, output_path: Path):
     result.save(output_path)
 
 
-def _run_tiler(mode: str, state: dict[str, tk.StringVar], verbose: tk.BooleanVar):
-    try:
-        input_path = Path(state["input"].get())
-        output_path = Path(state["output"].get())
-        if not input_path.exists():
-            raise FileNotFoundError(f"Input file not found: {input_path}")
-        if not output_path.suffix:
-            raise ValueError("Output path must include a file extension.")
-
-        if mode in {"single", "layers", "gif"}:
-            img = Image.open(input_path).convert("RGBA")
-            img = _rescale_if_needed(img, state["input_scale"], state["input_width"], state["input_height"], state["input_filter"])
-            tile_w, tile_h = _compute_tile_size(img, state["tile_size"], state["tile_width"], state["tile_height"])
-            min_scale = float(state["min_scale"].get() or 1.2)
-            max_scale = float(state["max_scale"].get() or 1.6)
-            background = state["background"].get() or None
-            tile_filter = state["tile_filter"].get()
-            seed = _parse_seed(state["seed"].get())
-
-            if mode == "single":
-                rng = random.Random(seed) if seed is not None else None
-                result = tt.build_single_tile(
-                    img,
-                    tile_w=tile_w,
-                    tile_h=tile_h,
-                    min_scale=min_scale,
-                    max_scale=max_scale,
-                    background=background,
-                    tile_filter=tile_filter,
-                    rng=rng,
-                )
-                _save_image(result, output_path)
-            elif mode == "layers":
-                rng = random.Random(seed) if seed is not None else random.Random()
-                count = int(state["count"].get() or 5)
-                result = tt.build_layered_tiles(
-                    img,
-                    tile_w=tile_w,
-                    tile_h=tile_h,
-                    tile_count=count,
-                    min_scale=min_scale,
-                    max_scale=max_scale,
-                    background=background,
-                    tile_filter=tile_filter,
-                    rng=rng,
-                    verbose=verbose.get(),
-                )
-                _save_image(result, output_path)
-            else:
-                frames = int(state["frames"].get() or 12)
-                tiles = int(state["tiles"].get() or 6)
-                fps = int(state["fps"].get() or 6)
-                frames_seq = tt.build_animation_frames(
-                    img,
-                    frames=frames,
-                    tiles_per_frame=tiles,
-                    tile_w=tile_w,
-                    tile_h=tile_h,
-                    min_scale=min_scale,
-                    max_scale=max_scale,
-                    background=background,
-                    tile_filter=tile_filter,
-                    seed=seed,
-                    verbose=verbose.get(),
-                )
-                tt.save_animation(frames_seq, output_path, fps=fps)
-        else:
-            img = Image.open(input_path)
-            mode_choice = state["mode"].get()
-            filter_name = state["filter"].get()
-            background = state["background"].get() or "#000000"
-            kwargs: dict[str, float | int | str] = {
-                "mode": mode_choice,
-                "filter_name": filter_name,
-                "background": background,
-            }
-            scale = _parse_float(state["scale"].get())
-            width = _parse_int(state["width"].get())
-            height = _parse_int(state["height"].get())
-            if scale is not None:
-                kwargs["scale"] = scale
-            else:
-                if width is None or height is None:
-                    raise ValueError("Upscale requires either scale or both width and height.")
-                kwargs["width"] = width
-                kwargs["height"] = height
-
-            result = tt.upscale_image(img, **kwargs)
+def _run_tiler(mode: str, values: dict[str, str], verbose: bool, cancel_event: threading.Event) -> Path:
+    """Run one job from a snapshot of the form values and return the output path.
+
+    Called on the worker thread, so it must not touch Tk widgets or variables; errors propagate
+    to the caller, which reports them back on the Tk thread.
+    """
+    from PIL import Image
+
+    import tiler_toolkit as tt
+
+    parsed = _parse_state(values, _MODE_FIELDS[mode])
+    input_path = Path(values["input"])
+    output_path = Path(values["output"])
+    if not input_path.exists():
+        raise FileNotFoundError(f"Input file not found: {input_path}")
+    if not output_path.suffix:
+        raise ValueError("Output path must include a file extension.")
+
+    if mode in {"single", "layers", "gif"}:
+        scale, width, height = parsed["input_scale"], parsed["input_width"], parsed["input_height"]
+        _check_pre_scale(scale, width, height)
+        stat = input_path.stat()
+        img = _load_source(
+            str(input_path.resolve()),
+            stat.st_mtime_ns,
+            stat.st_size,
+            scale,
+            width,
+            height,
+            values["input_filter"],
+        )
+        tile_w, tile_h = tt.resolve_tile_size(img.size, parsed["tile_size"], parsed["tile_width"], parsed["tile_height"])
+        min_scale = parsed["min_scale"]
+        max_scale = parsed["max_scale"]
+        background = values["background"] or None
+        tile_filter = values["tile_filter"]
+        seed = parsed["seed"]
+
+        if mode == "single":
+            rng = random.Random(seed) if seed is not None else None
+            result = tt.build_single_tile(
+                img,
+                tile_w=tile_w,
+                tile_h=tile_h,
+                min_scale=min_scale,
+                max_scale=max_scale,
+                background=background,
+                tile_filter=tile_filter,
+                rng=rng,
+            )
             _save_image(result, output_path)
-
-        messagebox.showinfo("Success", f"Saved output to {output_path}")
-    except Exception as exc:  # noqa: BLE001 - surface user-friendly errors
-        messagebox.showerror("Error", str(exc))
+        elif mode == "layers":
+            rng = random.Random(seed) if seed is not None else random.Random()
+            count = parsed["count"]
+            result = tt.build_layered_tiles(
+                img,
+                tile_w=tile_w,
+                tile_h=tile_h,
+                tile_count=count,
+                min_scale=min_scale,
+                max_scale=max_scale,
+                background=background,
+                tile_filter=tile_filter,
+                rng=rng,
+                verbose=verbose,
+            )
+            _save_image(result, output_path)
+        else:
+            frames = parsed["frames"]
+            tiles = parsed["tiles"]
+            fps = parsed["fps"]
+            frames_seq = tt.iter_animation_frames(
+                img,
+                frames=frames,
+                tiles_per_frame=tiles,
+                tile_w=tile_w,
+                tile_h=tile_h,
+                min_scale=min_scale,
+                max_scale=max_scale,
+                background=background,
+                tile_filter=tile_filter,
+                seed=seed,
+                verbose=verbose,
+                jobs=None,
+                cancel_cb=cancel_event.is_set,
+            )
+            tt.save_animation(frames_seq, output_path, fps=fps)
+    else:
+        img = Image.open(input_path)
+        src_w, src_h = img.size
+        scale, width, height = parsed["scale"], parsed["width"], parsed["height"]
+        if scale is not None:
+            width, height = int(round(src_w * scale)), int(round(src_h * scale))
+        elif width is None or height is None:
+            raise ValueError("Upscale requires either scale or both width and height.")
+        tt.draft_for_target(img, width, height)
+
+        result = tt.upscale_image(
+            img,
+            width=width,
+            height=height,
+            mode=values["mode"],
+            filter_name=values["filter"],
+            background=values["background"] or "#000000",
+        )
+        _save_image(result, output_path)
+
+    return output_path
+
+
+def _job_worker(jobs: queue.Queue, results: queue.Queue, cancel_event: threading.Event):
+    """Daemon loop: run queued jobs one at a time and post ``(ok, output_path_or_error)`` back."""
+    while True:
+        mode, values, verbose = jobs.get()
+        try:
+            results.put((True, _run_tiler(mode, values, verbose, cancel_event)))
+        except Exception as exc:  # noqa: BLE001 - surface user-friendly errors
+            results.put((False, exc))
 
 
 def _choose_input(var: tk.StringVar):
@@ -221,9 +275,6 @@ def _build_tile_settings(frame: ttk.LabelFrame, state: dict[str, tk.StringVar]):
 
 
 def _build_mode_specific(frame: ttk.Frame, mode: str, state: dict[str, tk.StringVar], verbose: tk.BooleanVar):
-    for widget in frame.winfo_children():
-        widget.destroy()
-
     if mode == "layers":
         ttk.Label(frame, text="Tile Count").grid(row=0, column=0, sticky="e", padx=4, pady=2)
         ttk.Entry(frame, textvariable=state["count"], width=6).grid(row=0, column=1, sticky="w", padx=4, pady=2)
@@ -253,6 +304,21 @@ def _build_mode_specific(frame: ttk.Frame, mode: str, state: dict[str, tk.String
         ttk.Label(frame, text="No extra options for single mode.").grid(row=0, column=0, padx=4, pady=2, sticky="w")
 
 
+def _build_mode_frames(parent: ttk.LabelFrame, state: dict[str, tk.StringVar], verbose: tk.BooleanVar) -> dict[str, ttk.Frame]:
+    """Build every mode's option widgets once; switching modes then only changes which frame is gridded."""
+    frames: dict[str, ttk.Frame] = {}
+    for mode in ("single", "layers", "gif", "upscale"):
+        frames[mode] = ttk.Frame(parent)
+        _build_mode_specific(frames[mode], mode, state, verbose)
+    return frames
+
+
+def _show_mode_frame(frames: dict[str, ttk.Frame], mode: str):
+    for frame in frames.values():
+        frame.grid_remove()
+    frames[mode].grid(row=0, column=0, sticky="we")
+
+
 def main():
     root = tk.Tk()
     root.title("Tiler GUI")
@@ -305,6 +371,7 @@ def main():
 
     mode_frame = ttk.LabelFrame(root, text="Mode options")
     mode_frame.pack(fill="x", padx=8, pady=4)
+    mode_frames = _build_mode_frames(mode_frame, state, verbose)
 
     def update_defaults(*_args):
         mode = mode_var.get()
@@ -312,17 +379,62 @@ def main():
             state["tile_size"].set("0.2")
         else:
             state["tile_size"].set("0.25")
-        _build_mode_specific(mode_frame, mode, state, verbose)
+        _show_mode_frame(mode_frames, mode)
 
     mode_var.trace_add("write", update_defaults)
     update_defaults()
 
-    run_btn = ttk.Button(
-        root,
-        text="Run",
-        command=lambda: _run_tiler(mode_var.get(), state, verbose),
-    )
-    run_btn.pack(pady=8)
+    # Jobs run on a worker thread so the window stays responsive; only this (Tk) thread touches widgets
+    jobs: queue.Queue = queue.Queue()
+    results: queue.Queue = queue.Queue()
+    cancel_event = threading.Event()
+    threading.Thread(target=_job_worker, args=(jobs, results, cancel_event), daemon=True).start()
+
+    actions = ttk.Frame(root)
+    actions.pack(pady=8)
+    status_var = tk.StringVar()
+
+    def poll_done():
+        from tiler_toolkit import AnimationCancelled
+
+        try:
+            ok, payload = results.get_nowait()
+        except queue.Empty:
+            root.after(100, poll_done)
+            return
+        run_btn.state(["!disabled"])
+        cancel_btn.state(["disabled"])
+        status_var.set("")
+        if ok:
+            messagebox.showinfo("Success", f"Saved output to {payload}")
+        elif isinstance(payload, AnimationCancelled):
+            messagebox.showinfo("Cancelled", str(payload))
+        else:
+            messagebox.showerror("Error", str(payload))
+
+    def start_run():
+        cancel_event.clear()
+        mode = mode_var.get()
+        values = {key: var.get() for key, var in state.items()}
+        jobs.put((mode, values, verbose.get()))
+        run_btn.state(["disabled"])
+        # Only the GIF path checks cancel_event, between frames
+        if mode == "gif":
+            cancel_btn.state(["!disabled"])
+        status_var.set("Running...")
+        root.after(100, poll_done)
+
+    def cancel_run():
+        cancel_event.set()
+        cancel_btn.state(["disabled"])
+        status_var.set("Cancelling...")
+
+    run_btn = ttk.Button(actions, text="Run", command=start_run)
+    run_btn.grid(row=0, column=0, padx=4)
+    cancel_btn = ttk.Button(actions, text="Cancel", command=cancel_run)
+    cancel_btn.grid(row=0, column=1, padx=4)
+    cancel_btn.state(["disabled"])
+    ttk.Label(actions, textvariable=status_var).grid(row=0, column=2, padx=4)
 
     root.mainloop()
 
@@ -12,13 +12,26 @@ used by a CLI or imported into other projects.
 """
 from __future__ import annotations
 
+import math
+import multiprocessing
 import os
 import random
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
 from dataclasses import dataclass
 from pathlib import Path
-from typing import List, Sequence, Tuple
+from typing import Callable, Deque, Iterable, Iterator, List, Tuple
 
-from PIL import Image
+from PIL import Image, ImageColor
+
+
+# Downscales of at least twice this ratio first shrink by an integer factor with Image.reduce(),
+# then resample the rest; the difference from a full resample is at most a couple of levels
+REDUCING_GAP = 3.0
+
+
+class AnimationCancelled(Exception):
+    """Raised by ``iter_animation_frames`` when its ``cancel_cb`` asks it to stop."""
 
 
 @dataclass
@@ -50,15 +63,33 @@ def _resolve_resample(filter_name: str) -> int:
         raise ValueError(f"Unknown filter '{filter_name}'") from exc
 
 
-def rescale_image(
-    img: Image.Image,
+def to_working_mode(img: Image.Image) -> Image.Image:
+    """Keep RGB images as they are and convert anything else to RGBA.
+
+    Opaque sources (typical JPEGs) then skip the alpha premultiply Pillow performs around every
+    RGBA resize, while transparent ones keep their alpha.
+    """
+    return img if img.mode == "RGB" else img.convert("RGBA")
+
+
+def _resolve_background(background: str | Tuple[int, int, int] | None) -> Tuple[int, int, int] | None:
+    """Parse a background colour once so per-tile ``Image.new`` calls get a ready RGB tuple."""
+    if background is None or isinstance(background, tuple):
+        return background
+    try:
+        return ImageColor.getcolor(background, "RGB")
+    except ValueError as exc:
+        raise ValueError(f"Unknown background color '{background}'") from exc
+
+
+def rescaled_size(
+    size: Tuple[int, int],
     *,
     width: int | None = None,
     height: int | None = None,
     scale: float | None = None,
-    filter_name: str = "lanczos",
-) -> Image.Image:
-    """Resize ``img`` with a uniform scale factor or explicit dimensions."""
+) -> Tuple[int, int]:
+    """Return the ``(width, height)`` that ``rescale_image`` would produce for an image of ``size``."""
 
     if scale is None and (width is None or height is None):
         raise ValueError("Provide either scale or both width and height")
@@ -68,19 +99,82 @@ def rescale_image(
     if scale is not None:
         if scale <= 0:
             raise ValueError("scale must be positive")
-        width = max(1, int(round(img.size[0] * scale)))
-        height = max(1, int(round(img.size[1] * scale)))
+        width = max(1, int(round(size[0] * scale)))
+        height = max(1, int(round(size[1] * scale)))
 
     assert width is not None and height is not None
     _ensure_positive(width, "width")
     _ensure_positive(height, "height")
+    return width, height
 
+
+def rescale_image(
+    img: Image.Image,
+    *,
+    width: int | None = None,
+    height: int | None = None,
+    scale: float | None = None,
+    filter_name: str = "lanczos",
+) -> Image.Image:
+    """Resize ``img`` with a uniform scale factor or explicit dimensions."""
+    size = rescaled_size(img.size, width=width, height=height, scale=scale)
     resample = _resolve_resample(filter_name)
-    return img.resize((width, height), resample=resample)
+    return img.resize(size, resample=resample, reducing_gap=REDUCING_GAP)
+
+
+def resolve_tile_size(
+    img_size: Tuple[int, int],
+    fraction: float,
+    tile_w: int | None = None,
+    tile_h: int | None = None,
+) -> Tuple[int, int]:
+    """Return explicit tile dimensions, falling back to ``fraction`` of the smaller image side."""
+    if tile_w and tile_h:
+        return tile_w, tile_h
+    base = int(round(min(img_size) * fraction))
+    return tile_w or base, tile_h or base
+
+
+def load_source(
+    path: os.PathLike[str] | str,
+    *,
+    width: int | None = None,
+    height: int | None = None,
+    scale: float | None = None,
+    filter_name: str = "lanczos",
+) -> Image.Image:
+    """Open ``path`` in working mode, optionally pre-scaled with ``rescale_image``'s arguments."""
+    img = Image.open(path)
+    if scale is None and width is None and height is None:
+        return to_working_mode(img)
+    width, height = rescaled_size(img.size, width=width, height=height, scale=scale)
+    # JPEGs can decode straight to a 1/2, 1/4 or 1/8 reduction that still covers the target
+    img.draft("RGB", (width, height))
+    return rescale_image(to_working_mode(img), width=width, height=height, filter_name=filter_name)
+
+
+def draft_for_target(img: Image.Image, width: int, height: int):
+    """Let a not-yet-loaded JPEG decode at a reduced size that still covers an ``upscale_image`` target.
+
+    Every mode resizes by at most the larger of the two ratios, so the decoder may pick the
+    smallest 1/2, 1/4 or 1/8 reduction that covers that. Other formats ignore the request.
+    """
+    if width <= 0 or height <= 0:
+        return
+    src_w, src_h = img.size
+    factor = max(width / src_w, height / src_h)
+    img.draft("RGB", (math.ceil(src_w * factor), math.ceil(src_h * factor)))
 
 
-def choose_random_tile_position(img_w: int, img_h: int, tile_w: int, tile_h: int) -> Tuple[int, int, int, int]:
+def choose_random_tile_position(
+    img_w: int,
+    img_h: int,
+    tile_w: int,
+    tile_h: int,
+    rng: random.Random | None = None,
+) -> Tuple[int, int, int, int]:
     """Return (left, top, center_x, center_y) for a tile fully inside the image."""
+    rng = rng or random
     _ensure_positive(tile_w, "tile_w")
     _ensure_positive(tile_h, "tile_h")
     if tile_w > img_w or tile_h > img_h:
@@ -88,8 +182,8 @@ def choose_random_tile_position(img_w: int, img_h: int, tile_w: int, tile_h: int
 
     max_left = img_w - tile_w
     max_top = img_h - tile_h
-    left = random.randint(0, max_left)
-    top = random.randint(0, max_top)
+    left = rng.randint(0, max_left)
+    top = rng.randint(0, max_top)
     center_x = left + tile_w // 2
     center_y = top + tile_h // 2
     return left, top, center_x, center_y
@@ -105,53 +199,36 @@ def crop_and_scale_tile(
     *,
     resample: int = Image.LANCZOS,
 ) -> Image.Image:
-    right = left + tile_w
-    bottom = top + tile_h
-    tile = src_img.crop((left, top, right, bottom))
     new_w = max(1, int(round(tile_w * scale)))
     new_h = max(1, int(round(tile_h * scale)))
-    return tile.resize((new_w, new_h), resample=resample)
+    box = (left, top, left + tile_w, top + tile_h)
+    if (new_w, new_h) == (tile_w, tile_h):
+        # Scale rounds to the original size: the resample would be an exact copy of the region
+        return src_img.crop(box)
+    if src_img.mode == "RGBA":
+        # Pillow premultiplies the whole RGBA image on every resize, so cut the region out first
+        return src_img.crop(box).resize((new_w, new_h), resample=resample, reducing_gap=REDUCING_GAP)
+    # Resample straight from the source region instead of cropping a copy of it first
+    return src_img.resize((new_w, new_h), resample=resample, box=box, reducing_gap=REDUCING_GAP)
 
 
 def paste_with_center(dest: Image.Image, src: Image.Image, center_x: int, center_y: int):
-    """Paste ``src`` into ``dest`` so their centers align; crops when necessary."""
-    dest_w, dest_h = dest.size
+    """Paste ``src`` into ``dest`` so their centers align; ``Image.paste`` clips any overhang."""
     src_w, src_h = src.size
-    paste_x = center_x - src_w // 2
-    paste_y = center_y - src_h // 2
-
-    src_left = 0
-    src_top = 0
-    dst_left = paste_x
-    dst_top = paste_y
-
-    if paste_x < 0:
-        src_left = -paste_x
-        dst_left = 0
-    if paste_y < 0:
-        src_top = -paste_y
-        dst_top = 0
-
-    src_right = src_w
-    src_bottom = src_h
-    if paste_x + src_w > dest_w:
-        src_right = src_w - ((paste_x + src_w) - dest_w)
-    if paste_y + src_h > dest_h:
-        src_bottom = src_h - ((paste_y + src_h) - dest_h)
-
-    if src_left >= src_right or src_top >= src_bottom:
-        return
+    mask = src if src.mode == "RGBA" else None
+    dest.paste(src, (center_x - src_w // 2, center_y - src_h // 2), mask)
 
-    src_crop = src.crop((src_left, src_top, src_right, src_bottom))
-    mask = src_crop if src_crop.mode == "RGBA" else None
-    dest.paste(src_crop, (dst_left, dst_top), mask)
 
+def flatten_opaque(img: Image.Image, bg_color: str | Tuple[int, int, int]) -> Image.Image:
+    """Ensure the tile is opaque by compositing onto ``bg_color``.
 
-def flatten_opaque(img: Image.Image, bg_color: str) -> Image.Image:
-    """Ensure the tile is opaque by compositing onto ``bg_color``."""
+    RGB input is returned as-is rather than copied, so callers must not mutate the result in place.
+    """
+    if img.mode == "RGB":
+        return img
     if img.mode == "RGBA":
         bg = Image.new("RGB", img.size, bg_color)
-        bg.paste(img, mask=img.split()[-1])
+        bg.paste(img, mask=img)
         return bg
     return img.convert("RGB")
 
@@ -169,20 +246,27 @@ def build_single_tile(
     rng = rng or random
     img_w, img_h = src.size
     resample = _resolve_resample(tile_filter)
-    left, top, center_x, center_y = choose_random_tile_position(img_w, img_h, tile_w, tile_h)
+    left, top, center_x, center_y = choose_random_tile_position(img_w, img_h, tile_w, tile_h, rng)
     scale = rng.uniform(min_scale, max_scale)
     tile = crop_and_scale_tile(src, left, top, tile_w, tile_h, scale, resample=resample)
 
-    canvas = Image.new("RGBA", (img_w, img_h), (0, 0, 0, 0))
-    paste_with_center(canvas, tile, center_x, center_y)
-
     if background:
-        final = Image.new("RGB", (img_w, img_h), background)
-        final.paste(canvas, mask=canvas.split()[-1])
-        return final
+        # Blend the tile straight onto the background; going through a transparent canvas would
+        # apply the tile's alpha twice
+        canvas = Image.new("RGB", (img_w, img_h), background)
+        paste_with_center(canvas, tile, center_x, center_y)
+        return canvas
+    canvas = Image.new("RGBA", (img_w, img_h), (0, 0, 0, 0))
+    # Over a fully transparent canvas the result is the tile itself, so copy it without a mask
+    canvas.paste(tile, (center_x - tile.width // 2, center_y - tile.height // 2))
     return canvas
 
 
+# Per-process state for spawned layer and animation pool workers, filled in once by their
+# initializers; in-process rendering never touches it
+_WORKER: dict = {}
+
+
 def build_layered_tiles(
     src: Image.Image,
     tile_w: int,
@@ -190,44 +274,192 @@ def build_layered_tiles(
     tile_count: int,
     min_scale: float,
     max_scale: float,
-    background: str,
+    background: str | Tuple[int, int, int],
     rng: random.Random | None = None,
     tile_filter: str = "lanczos",
     verbose: bool = False,
+    jobs: int | None = 1,
+    log: List[str] | None = None,
 ) -> Image.Image:
+    """Composite ``tile_count`` magnified tiles in a shuffled order.
+
+    Positions, scales and the layer order are all drawn from ``rng`` up front; only the
+    crop/resize/flatten work is handed to ``jobs`` worker processes (``None`` uses every CPU),
+    so the result is identical for a given ``rng`` whatever the job count.
+    If ``log`` is a list, the ``verbose`` lines are appended to it instead of being printed.
+    """
+    emit = log.append if log is not None else print
+    if jobs is not None:
+        _ensure_positive(jobs, "jobs")
     rng = rng or random.Random()
+    background = _resolve_background(background)
     img_w, img_h = src.size
     resample = _resolve_resample(tile_filter)
-    placements: List[TilePlacement] = []
+    # Parallel per-tile lists: boxes and scales feed the workers, centers the paste loop
+    boxes: List[Tuple[int, int, int, int]] = []
+    scales: List[float] = []
+    centers: List[Tuple[int, int]] = []
     for idx in range(tile_count):
-        left, top, cx, cy = choose_random_tile_position(img_w, img_h, tile_w, tile_h)
+        left, top, cx, cy = choose_random_tile_position(img_w, img_h, tile_w, tile_h, rng)
         scale = rng.uniform(min_scale, max_scale)
-        tile = crop_and_scale_tile(src, left, top, tile_w, tile_h, scale, resample=resample)
-        placements.append(
-            TilePlacement(
-                image=flatten_opaque(tile, background),
-                center=(cx, cy),
-                scale=scale,
-                box=(left, top, left + tile_w, top + tile_h),
-            )
-        )
+        boxes.append((left, top, left + tile_w, top + tile_h))
+        scales.append(scale)
+        centers.append((cx, cy))
         if verbose:
-            print(f"tile#{idx}: box={left,top,tile_w,tile_h} center=({cx},{cy}) scale={scale:.3f} size={tile.size}")
+            size = (max(1, int(round(tile_w * scale))), max(1, int(round(tile_h * scale))))
+            emit(f"tile#{idx}: box={left,top,tile_w,tile_h} center=({cx},{cy}) scale={scale:.3f} size={size}")
+
+    if jobs == 1 or tile_count <= 1:
+        tiles = [_render_tile(src, resample, background, box, scale) for box, scale in zip(boxes, scales)]
+    else:
+        with ProcessPoolExecutor(
+            max_workers=jobs,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_layer_worker,
+            initargs=(src, resample, background),
+        ) as pool:
+            tiles = list(pool.map(_render_layer_tile, boxes, scales))
 
     order = list(range(tile_count))
     rng.shuffle(order)
     if verbose:
-        print(f"layer order: {order}")
+        emit(f"layer order: {order}")
 
     canvas = Image.new("RGB", (img_w, img_h), background)
     for layer_pos, idx in enumerate(order):
-        placement = placements[idx]
-        paste_with_center(canvas, placement.image, placement.center[0], placement.center[1])
+        cx, cy = centers[idx]
+        paste_with_center(canvas, tiles[idx], cx, cy)
         if verbose:
-            print(f" paste layer {layer_pos} -> tile#{idx} size={placement.image.size}")
+            emit(f" paste layer {layer_pos} -> tile#{idx} size={tiles[idx].size}")
     return canvas
 
 
+def _render_tile(
+    src: Image.Image,
+    resample: int,
+    background: Tuple[int, int, int] | None,
+    box: Tuple[int, int, int, int],
+    scale: float,
+) -> Image.Image:
+    left, top, right, bottom = box
+    tile = crop_and_scale_tile(src, left, top, right - left, bottom - top, scale, resample=resample)
+    return flatten_opaque(tile, background)
+
+
+def _init_layer_worker(src: Image.Image, resample: int, background: Tuple[int, int, int] | None):
+    _WORKER["src"] = src
+    _WORKER["resample"] = resample
+    _WORKER["background"] = background
+
+
+def _render_layer_tile(box: Tuple[int, int, int, int], scale: float) -> Image.Image:
+    return _render_tile(_WORKER["src"], _WORKER["resample"], _WORKER["background"], box, scale)
+
+
+def _init_animation_worker(src: Image.Image, layer_kwargs: dict):
+    _WORKER["src"] = src
+    _WORKER["layer_kwargs"] = layer_kwargs
+
+
+def _layered_frame(src: Image.Image, layer_kwargs: dict, fi: int, frame_seed: int) -> Image.Image:
+    if not layer_kwargs["verbose"]:
+        return build_layered_tiles(src, rng=random.Random(frame_seed), **layer_kwargs)
+    # Print the frame's lines in one go so frames from parallel workers don't interleave
+    log = [f"[frame {fi}] seed={frame_seed}"]
+    frame = build_layered_tiles(src, rng=random.Random(frame_seed), log=log, **layer_kwargs)
+    print("\n".join(log), flush=True)
+    return frame
+
+
+def _render_animation_frame(fi: int, frame_seed: int) -> Image.Image:
+    return _layered_frame(_WORKER["src"], _WORKER["layer_kwargs"], fi, frame_seed)
+
+
+def iter_animation_frames(
+    src: Image.Image,
+    frames: int,
+    tiles_per_frame: int,
+    tile_w: int,
+    tile_h: int,
+    min_scale: float,
+    max_scale: float,
+    background: str,
+    tile_filter: str = "lanczos",
+    seed: int | None = None,
+    verbose: bool = False,
+    jobs: int | None = 1,
+    cancel_cb: Callable[[], bool] | None = None,
+) -> Iterator[Image.Image]:
+    """Yield ``frames`` independent layered frames in order.
+
+    Every frame gets its own seed drawn up front, so frames can be rendered by ``jobs`` worker
+    processes (``None`` uses every CPU) and still come out identical for a given ``seed``.
+    Workers run at most two frames per process ahead of the consumer, so feeding the iterator
+    straight into ``save_animation`` only keeps a few frames alive at a time.
+    ``cancel_cb`` is polled once per frame; when it returns true the remaining frames are
+    dropped and ``AnimationCancelled`` is raised.
+    """
+    if jobs is not None:
+        _ensure_positive(jobs, "jobs")
+    base_rng = random.Random(seed) if seed is not None else random.Random()
+    frame_seeds = [base_rng.randint(0, 2**63 - 1) for _ in range(frames)]
+    layer_kwargs = {
+        "tile_w": tile_w,
+        "tile_h": tile_h,
+        "tile_count": tiles_per_frame,
+        "min_scale": min_scale,
+        "max_scale": max_scale,
+        "background": _resolve_background(background),
+        "tile_filter": tile_filter,
+        "verbose": verbose,
+    }
+    if jobs == 1 or frames <= 1:
+        return _iter_frames_serial(src, layer_kwargs, frame_seeds, cancel_cb)
+    return _iter_frames_parallel(src, layer_kwargs, frame_seeds, jobs or os.cpu_count() or 1, cancel_cb)
+
+
+def _iter_frames_serial(
+    src: Image.Image,
+    layer_kwargs: dict,
+    frame_seeds: List[int],
+    cancel_cb: Callable[[], bool] | None,
+) -> Iterator[Image.Image]:
+    for fi, frame_seed in enumerate(frame_seeds):
+        if cancel_cb is not None and cancel_cb():
+            raise AnimationCancelled(f"Cancelled after {fi} of {len(frame_seeds)} frames")
+        yield _layered_frame(src, layer_kwargs, fi, frame_seed)
+
+
+def _iter_frames_parallel(
+    src: Image.Image,
+    layer_kwargs: dict,
+    frame_seeds: List[int],
+    workers: int,
+    cancel_cb: Callable[[], bool] | None,
+) -> Iterator[Image.Image]:
+    # Spawn keeps workers independent of whatever threads the caller (e.g. a GUI) is running
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_animation_worker,
+        initargs=(src, layer_kwargs),
+    ) as pool:
+        pending: Deque[Future] = deque()
+        next_fi = 0
+        try:
+            for fi in range(len(frame_seeds)):
+                while next_fi < len(frame_seeds) and len(pending) < 2 * workers:
+                    pending.append(pool.submit(_render_animation_frame, next_fi, frame_seeds[next_fi]))
+                    next_fi += 1
+                frame = pending.popleft().result()
+                if cancel_cb is not None and cancel_cb():
+                    raise AnimationCancelled(f"Cancelled after {fi} of {len(frame_seeds)} frames")
+                yield frame
+        finally:
+            # Also reached when the consumer stops early; don't render frames nobody will read
+            pool.shutdown(cancel_futures=True)
+
+
 def build_animation_frames(
     src: Image.Image,
     frames: int,
@@ -240,28 +472,27 @@ def build_animation_frames(
     tile_filter: str = "lanczos",
     seed: int | None = None,
     verbose: bool = False,
+    jobs: int | None = 1,
+    cancel_cb: Callable[[], bool] | None = None,
 ) -> List[Image.Image]:
-    base_rng = random.Random(seed) if seed is not None else random.Random()
-    result: List[Image.Image] = []
-    for fi in range(frames):
-        frame_seed = base_rng.randint(0, 2**63 - 1)
-        frame_rng = random.Random(frame_seed)
-        if verbose:
-            print(f"[frame {fi}] seed={frame_seed}")
-        frame = build_layered_tiles(
+    """Render every frame of ``iter_animation_frames`` into a list."""
+    return list(
+        iter_animation_frames(
             src,
-            tile_w=tile_w,
-            tile_h=tile_h,
-            tile_count=tiles_per_frame,
-            min_scale=min_scale,
-            max_scale=max_scale,
-            background=background,
+            frames,
+            tiles_per_frame,
+            tile_w,
+            tile_h,
+            min_scale,
+            max_scale,
+            background,
             tile_filter=tile_filter,
-            rng=frame_rng,
+            seed=seed,
             verbose=verbose,
+            jobs=jobs,
+            cancel_cb=cancel_cb,
         )
-        result.append(frame)
-    return result
+    )
 
 
 def upscale_image(
@@ -293,7 +524,7 @@ def upscale_image(
     resample = _resolve_resample(filter_name)
 
     if mode == "stretch":
-        return img.resize((width, height), resample=resample)
+        return img.resize((width, height), resample=resample, reducing_gap=REDUCING_GAP)
 
     src_ratio = src_w / src_h
     target_ratio = width / height
@@ -305,7 +536,7 @@ def upscale_image(
         else:
             new_h = height
             new_w = int(round(height * src_ratio))
-        resized = img.resize((new_w, new_h), resample=resample)
+        resized = img.resize((new_w, new_h), resample=resample, reducing_gap=REDUCING_GAP)
         canvas = Image.new("RGB", (width, height), background)
         offset = ((width - new_w) // 2, (height - new_h) // 2)
         canvas.paste(resized, offset)
@@ -318,21 +549,37 @@ def upscale_image(
     else:
         new_w = width
         new_h = int(round(width / src_ratio))
-    resized = img.resize((new_w, new_h), resample=resample)
+    resized = img.resize((new_w, new_h), resample=resample, reducing_gap=REDUCING_GAP)
     left = (new_w - width) // 2
     top = (new_h - height) // 2
     return resized.crop((left, top, left + width, top + height))
 
 
-def save_animation(frames: Sequence[Image.Image], output_path: os.PathLike[str] | str, fps: int = 6):
-    if not frames:
+def save_animation(frames: Iterable[Image.Image], output_path: os.PathLike[str] | str, fps: int = 6):
+    """Write ``frames`` as an animation.
+
+    ``frames`` may be a lazy iterator (e.g. from ``iter_animation_frames``); the GIF writer
+    palettizes each frame as it arrives, so the full-colour frames are never all held at once.
+    """
+    frames = iter(frames)
+    first = next(frames, None)
+    if first is None:
         raise ValueError("No frames to save")
-    Path(output_path).parent.mkdir(parents=True, exist_ok=True)
+    output_path = Path(output_path)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
     duration_ms = int(1000 / fps)
-    frames[0].save(
-        output_path,
-        save_all=True,
-        append_images=frames[1:],
-        duration=duration_ms,
-        loop=0,
-    )
+    # Frames keep arriving while the file is written, so a failure or cancel part-way through
+    # must not truncate an existing output: write alongside it and swap in only on success
+    tmp_path = output_path.with_name(f".{output_path.stem}.{os.getpid()}.tmp{output_path.suffix}")
+    try:
+        first.save(
+            tmp_path,
+            save_all=True,
+            append_images=frames,
+            duration=duration_ms,
+            loop=0,
+        )
+        os.replace(tmp_path, output_path)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise